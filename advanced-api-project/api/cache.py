@@ -0,0 +1,112 @@
+"""Response cache for read-heavy list/retrieve endpoints.
+
+Views mixing in ``CachedResponseMixin`` store the serialized ``response.data``
+of successful list/retrieve calls in the ``RESPONSE_CACHE_ALIAS`` cache. Keys
+combine the view's namespace, that namespace's current version, the caller's
+auth scope and the normalized URL, so invalidating a namespace is a single
+``incr`` of its version instead of a scan for matching keys; entries written
+under older versions simply expire. Works with any Django cache backend
+(locmem or file in development and tests, Redis in production).
+"""
+import hashlib
+import json
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from rest_framework.response import Response
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def get_cache():
+    return caches[_setting('RESPONSE_CACHE_ALIAS', 'default')]
+
+
+def _version_key(namespace):
+    return f'response:{namespace}:version'
+
+
+def get_version(namespace):
+    cache = get_cache()
+    key = _version_key(namespace)
+    version = cache.get(key)
+    if version is None:
+        # Start from the clock rather than 1 so that entries written before
+        # the version key was evicted can never be matched again.
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key)
+    return version
+
+
+def bump_version(namespace):
+    cache = get_cache()
+    try:
+        cache.incr(_version_key(namespace))
+    except ValueError:
+        # No version stored yet; the next get_version() starts a fresh one.
+        pass
+
+
+def invalidate(*namespaces):
+    """Drop every cached response in ``namespaces``.
+
+    The version is bumped right away so this process stops serving the old
+    data, and again once the transaction commits so a response cached by a
+    concurrent read of the pre-commit state is discarded as well.
+    """
+    for namespace in namespaces:
+        bump_version(namespace)
+        transaction.on_commit(lambda namespace=namespace: bump_version(namespace))
+
+
+class CachedResponseMixin:
+    """Cache ``list`` and ``retrieve`` responses per namespace and auth scope."""
+    cache_namespace = None
+
+    def get_cache_timeout(self):
+        return _setting('RESPONSE_CACHE_TIMEOUT', 60)
+
+    def get_cache_scope(self, request):
+        user = request.user
+        return f'user:{user.pk}' if user and user.is_authenticated else 'anon'
+
+    def get_cache_key(self, request):
+        params = sorted(
+            (name, value)
+            for name in request.query_params
+            for value in request.query_params.getlist(name)
+            if value != ''
+        )
+        raw = json.dumps([request.build_absolute_uri(request.path), params, request.accepted_media_type])
+        digest = hashlib.sha256(raw.encode()).hexdigest()
+        version = get_version(self.cache_namespace)
+        return f'response:{self.cache_namespace}:{version}:{self.get_cache_scope(request)}:{digest}'
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        timeout = self.get_cache_timeout()
+        if not timeout or self.cache_namespace is None:
+            return handler(request, *args, **kwargs)
+
+        cache = get_cache()
+        key = self.get_cache_key(request)
+        data = cache.get(key)
+        if data is not None:
+            response = Response(data)
+            response['X-Cache'] = 'HIT'
+            return response
+
+        response = handler(request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.set(key, response.data, timeout)
+        response['X-Cache'] = 'MISS'
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(super().retrieve, request, *args, **kwargs)
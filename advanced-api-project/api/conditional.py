@@ -0,0 +1,70 @@
+"""Conditional GET (ETag / Last-Modified) for retrieve endpoints.
+
+Views mixing in ``ConditionalRetrieveMixin`` compute a validator for the
+requested object from a cheap query (or from data already loaded, such as
+``request.user``) before the object is fetched or serialized. When the client
+sends a matching ``If-None-Match`` or ``If-Modified-Since`` the view answers
+``304 Not Modified`` straight away, so a repeat poll costs that one lookup and
+no JSON encoding.
+"""
+import hashlib
+import json
+
+from django.utils.http import http_date, parse_etags, parse_http_date_safe, quote_etag
+from rest_framework import status
+from rest_framework.response import Response
+
+
+def make_etag(*parts):
+    """Return a strong ETag for JSON-serializable ``parts``."""
+    raw = json.dumps(parts, default=str, separators=(',', ':'))
+    return quote_etag(hashlib.sha1(raw.encode()).hexdigest())
+
+
+def is_not_modified(request, etag, last_modified=None):
+    """Apply RFC 9110 precedence: If-None-Match wins over If-Modified-Since."""
+    if_none_match = request.headers.get('If-None-Match')
+    if if_none_match is not None:
+        etags = parse_etags(if_none_match)
+        return '*' in etags or etag in etags
+    if last_modified is not None:
+        since = parse_http_date_safe(request.headers.get('If-Modified-Since') or '')
+        return since is not None and int(last_modified.timestamp()) <= since
+    return False
+
+
+class ConditionalRetrieveMixin:
+    """Answer ``retrieve`` with 304 when the client's validator is current.
+
+    Subclasses implement ``get_validators()``. Only use this where reading
+    the object needs no object-level permission check, since a 304 is
+    returned before ``get_object()`` runs.
+    """
+
+    def get_validators(self, request, *args, **kwargs):
+        """Return the ``(etag_parts, last_modified)`` of the requested object.
+
+        ``last_modified`` may be None. Return None when the object does not
+        exist so the normal retrieve path produces the error response.
+        """
+        raise NotImplementedError
+
+    def retrieve(self, request, *args, **kwargs):
+        validators = self.get_validators(request, *args, **kwargs)
+        if validators is None:
+            return super().retrieve(request, *args, **kwargs)
+
+        etag_parts, last_modified = validators
+        # The same object renders differently per format (JSON, browsable API).
+        etag = make_etag(request.accepted_media_type, *etag_parts)
+        if is_not_modified(request, etag, last_modified):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = super().retrieve(request, *args, **kwargs)
+            if response.status_code != status.HTTP_200_OK:
+                return response
+
+        response['ETag'] = etag
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(last_modified.timestamp())
+        return response
@@ -8,7 +8,8 @@ This module contains comprehensive test cases for all API endpoints including:
 - Response data integrity and status code verification
 """
 
-from django.test import TestCase
+from django.test import TestCase, override_settings
+from django.core.cache import cache
 from django.contrib.auth.models import User
 from django.urls import reverse
 from rest_framework.test import APITestCase, APIClient
@@ -629,3 +630,94 @@ class SerializerValidationTestCase(APITestCase):
         
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
         self.assertEqual(response.data['data']['publication_year'], 2023)
+
+
+@override_settings(RESPONSE_CACHE_TIMEOUT=60)
+class ResponseCacheTestCase(APITestCase):
+    """
+    Test case for the cached book and author list endpoints.
+    """
+
+    def setUp(self):
+        """
+        Set up an author with one book and start from an empty cache.
+        """
+        cache.clear()
+        self.author = Author.objects.create(name="Cached Author")
+        self.book = Book.objects.create(title="Cached Book", publication_year=2001, author=self.author)
+
+    def test_repeated_list_is_served_from_cache(self):
+        """
+        Test that the second identical request is answered from the cache.
+        """
+        url = reverse('book-list')
+        self.assertEqual(self.client.get(url)['X-Cache'], 'MISS')
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+        self.assertEqual(response['X-Cache'], 'HIT')
+        self.assertEqual(response.data['results'][0]['title'], "Cached Book")
+
+    def test_query_parameter_order_is_normalized(self):
+        """
+        Test that reordered query parameters share one cache entry.
+        """
+        url = reverse('book-list')
+        self.client.get(url, {'search': 'Cached', 'ordering': 'title'})
+        response = self.client.get(url + '?ordering=title&search=Cached')
+        self.assertEqual(response['X-Cache'], 'HIT')
+
+    def test_book_changes_invalidate_author_list(self):
+        """
+        Test that saving a book refreshes the nested author list.
+        """
+        url = reverse('author-list')
+        self.client.get(url)
+        Book.objects.create(title="Second Book", publication_year=2002, author=self.author)
+
+        response = self.client.get(url)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(len(response.data['results'][0]['books']), 2)
+
+
+class ConditionalGetTestCase(APITestCase):
+    """
+    Test case for ETag handling on the book and author detail endpoints.
+    """
+
+    def setUp(self):
+        """
+        Set up an author with one book.
+        """
+        self.author = Author.objects.create(name="Polled Author")
+        self.book = Book.objects.create(title="Polled Book", publication_year=1999, author=self.author)
+
+    def test_book_detail_matching_etag_returns_304(self):
+        """
+        Test that a matching If-None-Match skips serialization.
+        """
+        url = reverse('book-detail', kwargs={'pk': self.book.pk})
+        etag = self.client.get(url)['ETag']
+        with self.assertNumQueries(1):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_author_detail_etag_changes_with_books(self):
+        """
+        Test that adding a book invalidates the author's ETag.
+        """
+        url = reverse('author-detail', kwargs={'pk': self.author.pk})
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_304_NOT_MODIFIED)
+
+        Book.objects.create(title="Sequel", publication_year=2000, author=self.author)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['books']), 2)
+
+    def test_missing_book_is_still_404(self):
+        """
+        Test that a wildcard If-None-Match does not hide a missing book.
+        """
+        url = reverse('book-detail', kwargs={'pk': self.book.pk + 1})
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH='*').status_code, status.HTTP_404_NOT_FOUND)
@@ -6,12 +6,15 @@ from rest_framework import filters
 from django_filters import rest_framework
 from django_filters.rest_framework import DjangoFilterBackend
 from django.shortcuts import get_object_or_404
+from django.core.exceptions import ValidationError
 from .models import Book, Author
 from .serializers import BookSerializer, AuthorSerializer
+from .cache import CachedResponseMixin
+from .conditional import ConditionalRetrieveMixin
 
 # ListView for retrieving all books with filtering, searching, and ordering
 # Allows both authenticated and unauthenticated users to view the list of books
-class BookListView(generics.ListAPIView):
+class BookListView(CachedResponseMixin, generics.ListAPIView):
     """
     API view to retrieve a list of all books with advanced query capabilities.
     
@@ -24,10 +27,14 @@ class BookListView(generics.ListAPIView):
     - Filtering: ?title=<title>&author=<author_id>&publication_year=<year>
     - Searching: ?search=<search_term> (searches title and author name)
     - Ordering: ?ordering=title,-publication_year (prefix with - for descending)
+
+    Responses are cached per query string (see api/cache.py) until a book or
+    author changes.
     """
     queryset = Book.objects.all()
     serializer_class = BookSerializer
     permission_classes = [permissions.AllowAny]  # Allow read access to everyone
+    cache_namespace = 'catalog'  # invalidated in api/signals.py
     
     # Enable filtering, searching, and ordering
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
@@ -44,18 +51,31 @@ class BookListView(generics.ListAPIView):
 
 # DetailView for retrieving a single book by ID
 # Allows both authenticated and unauthenticated users to view a specific book
-class BookDetailView(generics.RetrieveAPIView):
+class BookDetailView(ConditionalRetrieveMixin, generics.RetrieveAPIView):
     """
     API view to retrieve a single book by its ID.
     
     - GET /api/books/<id>/ : Returns details of a specific book
     - Permissions: Read-only access for all users (authenticated and unauthenticated)
     - Serializer: BookSerializer
+    - Conditional GET: responds with an ETag; If-None-Match gets 304 Not Modified
     """
     queryset = Book.objects.all()
     serializer_class = BookSerializer
     permission_classes = [permissions.AllowAny]  # Allow read access to everyone
 
+    def get_validators(self, request, *args, **kwargs):
+        """
+        Hash the serialized columns of the book, read with one primary key lookup.
+        """
+        try:
+            row = Book.objects.filter(pk=kwargs['pk']).values_list(
+                'pk', 'title', 'publication_year', 'author_id'
+            ).first()
+        except (TypeError, ValueError, ValidationError):
+            return None
+        return None if row is None else (row, None)
+
 # CreateView for adding a new book
 # Restricted to authenticated users only
 class BookCreateView(generics.CreateAPIView):
@@ -167,24 +187,41 @@ class BookDeleteView(generics.DestroyAPIView):
         )
 
 # Additional views for Author model (bonus implementation)
-class AuthorListView(generics.ListAPIView):
+class AuthorListView(CachedResponseMixin, generics.ListAPIView):
     """
     API view to retrieve a list of all authors with their books.
     
     - GET /api/authors/ : Returns a list of all authors with nested books
     - Permissions: Read-only access for all users
+    - Responses are cached until a book or author changes
     """
-    queryset = Author.objects.all()
+    queryset = Author.objects.prefetch_related('books')
     serializer_class = AuthorSerializer
     permission_classes = [permissions.AllowAny]
+    cache_namespace = 'catalog'  # invalidated in api/signals.py
 
-class AuthorDetailView(generics.RetrieveAPIView):
+class AuthorDetailView(ConditionalRetrieveMixin, generics.RetrieveAPIView):
     """
     API view to retrieve a single author with their books.
     
     - GET /api/authors/<id>/ : Returns details of a specific author with nested books
     - Permissions: Read-only access for all users
+    - Conditional GET: responds with an ETag; If-None-Match gets 304 Not Modified
     """
     queryset = Author.objects.all()
     serializer_class = AuthorSerializer
     permission_classes = [permissions.AllowAny]
+
+    def get_validators(self, request, *args, **kwargs):
+        """
+        Hash the author's name and nested book columns, read with one join.
+        """
+        try:
+            rows = list(
+                Author.objects.filter(pk=kwargs['pk'])
+                .values_list('pk', 'name', 'books__id', 'books__title', 'books__publication_year')
+                .order_by('books__id')
+            )
+        except (TypeError, ValueError, ValidationError):
+            return None
+        return (rows, None) if rows else None
@@ -0,0 +1,85 @@
+"""Token authentication with cached token -> user lookups.
+
+DRF's ``TokenAuthentication`` joins ``Token`` and ``User`` on every request.
+``CachedTokenAuthentication`` keeps two small entries in the
+``AUTH_TOKEN_CACHE_ALIAS`` cache instead:
+
+* ``auth:token:<sha256 of key>`` -> ``(user_id, created)``
+* ``auth:user:<user_id>`` -> the ``User`` snapshot
+
+so a warm request authenticates without touching the database. Entries
+expire after ``AUTH_TOKEN_CACHE_TIMEOUT`` seconds (``0`` disables caching)
+and the backend's eviction keeps the working set bounded. Revocation stays
+prompt through explicit invalidation: deleting a token (logout) drops its
+entry, and saving or deleting a user (password change, deactivation) drops
+the snapshot, so the next request re-reads and re-checks ``is_active``.
+Entries are dropped again once the writing transaction commits, in case a
+concurrent request re-cached the old row in between.
+
+Invalidation only reaches every worker process through a shared cache
+(Redis, Memcached, a database or file cache). With the per-process
+local-memory cache a revoked token would stay valid in the other workers
+until its entry expired, so the timeout defaults to ``0`` and should only be
+raised together with a shared ``AUTH_TOKEN_CACHE_ALIAS``.
+Writes that bypass model signals, such as ``QuerySet.update()``, are only
+picked up once the entry expires.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from rest_framework.authentication import TokenAuthentication
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def get_cache():
+    return caches[_setting('AUTH_TOKEN_CACHE_ALIAS', 'default')]
+
+
+def _token_key(key):
+    # Never put raw credentials into cache keys.
+    return 'auth:token:' + hashlib.sha256(key.encode()).hexdigest()
+
+
+def _user_key(user_id):
+    return f'auth:user:{user_id}'
+
+
+def _drop(cache_key):
+    get_cache().delete(cache_key)
+    transaction.on_commit(lambda: get_cache().delete(cache_key))
+
+
+def invalidate_token(key):
+    _drop(_token_key(key))
+
+
+def invalidate_user(user_id):
+    _drop(_user_key(user_id))
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """``TokenAuthentication`` that serves token -> user lookups from the cache."""
+
+    def authenticate_credentials(self, key):
+        timeout = _setting('AUTH_TOKEN_CACHE_TIMEOUT', 0)
+        if not timeout:
+            return super().authenticate_credentials(key)
+
+        cache = get_cache()
+        cached_token = cache.get(_token_key(key))
+        user = cache.get(_user_key(cached_token[0])) if cached_token else None
+        if user is not None:
+            return user, self.get_model()(key=key, user=user, created=cached_token[1])
+
+        # Miss: the normal lookup also rejects unknown keys and inactive users.
+        user, token = super().authenticate_credentials(key)
+        cache.set_many({
+            _token_key(key): (user.pk, token.created),
+            _user_key(user.pk): user,
+        }, timeout)
+        return user, token
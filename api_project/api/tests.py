@@ -1,3 +1,56 @@
-from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITestCase
 
-# Create your tests here.
+from .authentication import _user_key, get_cache
+
+User = get_user_model()
+
+
+@override_settings(AUTH_TOKEN_CACHE_TIMEOUT=300)
+class CachedTokenAuthenticationTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='reader', password='pass12345')
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def auth_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('book-list'))
+        return response.status_code, sum('authtoken_token' in q['sql'] for q in queries)
+
+    def test_warm_requests_skip_the_token_lookup(self):
+        self.assertEqual(self.auth_queries(), (200, 1))
+        self.assertEqual(self.auth_queries(), (200, 0))
+
+    def test_deleted_token_is_rejected(self):
+        self.auth_queries()
+        self.token.delete()
+        self.assertEqual(self.auth_queries()[0], 401)
+
+    def test_deactivated_user_is_rejected(self):
+        self.auth_queries()
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.auth_queries()[0], 401)
+
+    def test_entry_cached_before_commit_is_dropped_on_commit(self):
+        active = User.objects.get(pk=self.user.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                self.user.is_active = False
+                self.user.save()
+                # A concurrent request re-caches the old row before the commit.
+                get_cache().set(_user_key(self.user.pk), active, 300)
+        self.assertEqual(self.auth_queries()[0], 401)
+
+    @override_settings(AUTH_TOKEN_CACHE_TIMEOUT=0)
+    def test_caching_can_be_disabled(self):
+        self.assertEqual(self.auth_queries(), (200, 1))
+        self.assertEqual(self.auth_queries(), (200, 1))
@@ -0,0 +1,109 @@
+"""Follow/unfollow as direct writes on the ``User.following`` join table.
+
+``follow_many`` is one ``INSERT ... SELECT ... ON CONFLICT DO NOTHING
+RETURNING`` and ``unfollow_many`` one ``DELETE ... RETURNING``, so the rows
+that actually changed come back from the write itself: no existence check
+beforehand and no race between concurrent clicks. The counters are then
+adjusted for exactly those rows in the same transaction, with ``RETURNING``
+handing back the usernames the views report. Requires a backend with
+``RETURNING`` (PostgreSQL, or SQLite 3.35+).
+
+``m2m_changed`` is sent by hand for the changed rows so the feed backfill
+(``posts/signals.py``) and the cached follow graph (``accounts/signals.py``)
+keep working as they do for ``user.following.add()``.
+"""
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.db.models.signals import m2m_changed
+
+User = get_user_model()
+Follow = User.following.through
+
+
+def _tables():
+    quote = connection.ops.quote_name
+    return quote(Follow._meta.db_table), quote(User._meta.db_table)
+
+
+def _placeholders(values):
+    return ', '.join(['%s'] * len(values))
+
+
+def _send(follower_id, action, user_ids):
+    follower = User(pk=follower_id)
+    m2m_changed.send(
+        sender=Follow, instance=follower, action=action, reverse=False,
+        model=User, pk_set=set(user_ids), using=connection.alias,
+    )
+
+
+def follow_many(follower_id, user_ids):
+    """Make ``follower_id`` follow ``user_ids``.
+
+    Unknown IDs, the follower itself and users already followed are skipped.
+    Returns ``{user_id: username}`` for the follows that were created.
+    """
+    user_ids = sorted({int(user_id) for user_id in user_ids} - {follower_id})
+    if not user_ids:
+        return {}
+    follows, users = _tables()
+    ids = _placeholders(user_ids)
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {follows} (from_user_id, to_user_id) '
+            f'SELECT %s, id FROM {users} WHERE id IN ({ids}) '
+            f'ON CONFLICT (from_user_id, to_user_id) DO NOTHING RETURNING to_user_id',
+            [follower_id, *user_ids],
+        )
+        created = [row[0] for row in cursor.fetchall()]
+        if not created:
+            return {}
+        ids = _placeholders(created)
+        cursor.execute(
+            f'UPDATE {users} SET followers_count = followers_count + 1 '
+            f'WHERE id IN ({ids}) RETURNING id, username',
+            created,
+        )
+        followed = dict(cursor.fetchall())
+        cursor.execute(
+            f'UPDATE {users} SET following_count = following_count + %s WHERE id = %s',
+            [len(created), follower_id],
+        )
+        _send(follower_id, 'post_add', created)
+    return followed
+
+
+def unfollow_many(follower_id, user_ids):
+    """Make ``follower_id`` stop following ``user_ids``.
+
+    Returns ``{user_id: username}`` for the follows that were removed.
+    """
+    user_ids = sorted({int(user_id) for user_id in user_ids})
+    if not user_ids:
+        return {}
+    follows, users = _tables()
+    ids = _placeholders(user_ids)
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {follows} WHERE from_user_id = %s AND to_user_id IN ({ids}) RETURNING to_user_id',
+            [follower_id, *user_ids],
+        )
+        removed = [row[0] for row in cursor.fetchall()]
+        if not removed:
+            return {}
+        # CASE rather than a WHERE guard, so drifted rows still return usernames.
+        ids = _placeholders(removed)
+        cursor.execute(
+            f'UPDATE {users} SET followers_count = '
+            f'CASE WHEN followers_count > 0 THEN followers_count - 1 ELSE 0 END '
+            f'WHERE id IN ({ids}) RETURNING id, username',
+            removed,
+        )
+        unfollowed = dict(cursor.fetchall())
+        cursor.execute(
+            f'UPDATE {users} SET following_count = '
+            f'CASE WHEN following_count > %s THEN following_count - %s ELSE 0 END WHERE id = %s',
+            [len(removed), len(removed), follower_id],
+        )
+        _send(follower_id, 'post_remove', removed)
+    return unfollowed
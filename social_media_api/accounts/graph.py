@@ -0,0 +1,130 @@
+"""Cached view of the follow graph.
+
+Each user's following and follower IDs are kept as sets in the default cache
+(``graph:following:<id>`` / ``graph:followers:<id>``), loaded from the
+``User.following`` join table on first use. Membership checks, batch
+``is_following`` lookups and mutual-follow queries are answered from these
+sets, so most graph reads never reach SQL.
+
+A follow or unfollow does not patch cached sets, which would lose edges to
+concurrent read-modify-writes. The ``m2m_changed`` receiver in
+``accounts/signals.py`` deletes the sets it changes instead: right away, so
+this process stops answering from them, and again once the transaction
+commits, so a set reloaded by a concurrent read of the pre-commit state is
+dropped as well. A rolled-back follow therefore never reaches the cache.
+
+Users with more than ``GRAPH_MAX_CACHED_IDS`` edges on one side are not
+cached on that side; lookups against them fall back to indexed queries. The
+join table stays the source of truth: entries expire after
+``GRAPH_CACHE_TIMEOUT`` seconds, which is how long other processes can serve
+a changed set when the cache is per process (local memory) rather than
+shared. Sets are loaded from the primary database,
+never a read replica, so a lagging replica cannot cache a stale edge list for
+that long.
+"""
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+
+from social_media_api.replicas import use_primary
+
+User = get_user_model()
+Follow = User.following.through
+
+FOLLOWING = 'following'
+FOLLOWERS = 'followers'
+# Stored instead of an ID set when a side has too many edges to cache.
+OVERSIZED = 'oversized'
+
+# (column holding the user, column holding the other end) for each side.
+_COLUMNS = {
+    FOLLOWING: ('from_user_id', 'to_user_id'),
+    FOLLOWERS: ('to_user_id', 'from_user_id'),
+}
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def _key(side, user_id):
+    return f'graph:{side}:{user_id}'
+
+
+def _edges(side, user_id):
+    owner, other = _COLUMNS[side]
+    return Follow.objects.filter(**{owner: user_id}).values_list(other, flat=True)
+
+
+def _cached_ids(side, user_id):
+    """Return the cached ID set for one side, or None if it is oversized."""
+    key = _key(side, user_id)
+    ids = cache.get(key)
+    if ids is None:
+        limit = _setting('GRAPH_MAX_CACHED_IDS', 50000)
+        with use_primary():
+            ids = set(_edges(side, user_id)[:limit + 1])
+        if len(ids) > limit:
+            ids = OVERSIZED
+        cache.set(key, ids, _setting('GRAPH_CACHE_TIMEOUT', 3600))
+    return None if ids == OVERSIZED else ids
+
+
+def _ids(side, user_id):
+    ids = _cached_ids(side, user_id)
+    return frozenset(ids) if ids is not None else frozenset(_edges(side, user_id))
+
+
+def following_ids(user_id):
+    """IDs of the users ``user_id`` follows."""
+    return _ids(FOLLOWING, user_id)
+
+
+def follower_ids(user_id):
+    """IDs of the users following ``user_id``."""
+    return _ids(FOLLOWERS, user_id)
+
+
+def following_map(user_id, target_ids):
+    """Return ``{target_id: bool}`` telling which targets ``user_id`` follows."""
+    target_ids = set(target_ids)
+    ids = _cached_ids(FOLLOWING, user_id)
+    if ids is None:
+        ids = set(_edges(FOLLOWING, user_id).filter(to_user_id__in=target_ids))
+    return {target_id: target_id in ids for target_id in target_ids}
+
+
+def is_following(user_id, target_id):
+    return following_map(user_id, [target_id])[target_id]
+
+
+def mutual_ids(user_id):
+    """IDs of the users who follow ``user_id`` and are followed back."""
+    following = _cached_ids(FOLLOWING, user_id)
+    followers = _cached_ids(FOLLOWERS, user_id)
+    if following is not None and followers is not None:
+        return frozenset(following & followers)
+    # Intersect in the database rather than loading an oversized side.
+    return frozenset(
+        _edges(FOLLOWING, user_id).filter(to_user_id__in=_edges(FOLLOWERS, user_id))
+    )
+
+
+def is_mutual(user_id, other_id):
+    return is_following(user_id, other_id) and is_following(other_id, user_id)
+
+
+def _drop(keys):
+    cache.delete_many(keys)
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def record_edges(follower_id, followee_ids):
+    """Drop the sets that ``follower_id -> followee_ids`` (un)follows change."""
+    _drop([_key(FOLLOWING, follower_id)] + [_key(FOLLOWERS, followee_id) for followee_id in followee_ids])
+
+
+def invalidate(*user_ids):
+    """Forget both sides of ``user_ids``; they are reloaded on next use."""
+    _drop([_key(side, user_id) for user_id in user_ids for side in (FOLLOWING, FOLLOWERS)])
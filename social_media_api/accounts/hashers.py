@@ -0,0 +1,25 @@
+from django.conf import settings
+from django.contrib.auth.hashers import Argon2PasswordHasher
+
+
+class TunedArgon2PasswordHasher(Argon2PasswordHasher):
+    """Argon2id with cost parameters taken from settings.
+
+    Django's defaults (100 MiB, parallelism 8) are sized for a dedicated
+    machine; the settings default to OWASP's 19 MiB / 2 passes / 1 lane,
+    which verifies several times faster per core than PBKDF2's 600k
+    iterations. Hashes made with other parameters are upgraded on the next
+    successful login (``must_update`` compares them).
+    """
+
+    @property
+    def time_cost(self):
+        return getattr(settings, 'ARGON2_TIME_COST', 2)
+
+    @property
+    def memory_cost(self):
+        return getattr(settings, 'ARGON2_MEMORY_COST', 19456)
+
+    @property
+    def parallelism(self):
+        return getattr(settings, 'ARGON2_PARALLELISM', 1)
@@ -0,0 +1,41 @@
+"""Bounded concurrency for credential checks.
+
+Password hashing is deliberately slow, so a burst of logins or registrations
+can occupy every worker thread at once. ``credential_check_slot()`` lets at
+most ``LOGIN_MAX_CONCURRENT_CHECKS`` hash computations run per process and
+makes the rest wait up to ``LOGIN_QUEUE_TIMEOUT`` seconds before answering
+429, leaving threads free for other requests. With gunicorn's sync workers
+each process serves one request at a time, so the limit only matters for
+threaded or async workers.
+"""
+import contextlib
+import os
+import threading
+
+from django.conf import settings
+from rest_framework.exceptions import Throttled
+
+_semaphore = None
+_semaphore_lock = threading.Lock()
+
+
+def _get_semaphore():
+    global _semaphore
+    if _semaphore is None:
+        with _semaphore_lock:
+            if _semaphore is None:
+                limit = getattr(settings, 'LOGIN_MAX_CONCURRENT_CHECKS', None) or os.cpu_count() or 1
+                _semaphore = threading.BoundedSemaphore(limit)
+    return _semaphore
+
+
+@contextlib.contextmanager
+def credential_check_slot():
+    semaphore = _get_semaphore()
+    timeout = getattr(settings, 'LOGIN_QUEUE_TIMEOUT', 5)
+    if not semaphore.acquire(timeout=timeout):
+        raise Throttled(wait=1, detail='Too many concurrent sign-ins, please retry.')
+    try:
+        yield
+    finally:
+        semaphore.release()
@@ -0,0 +1,45 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils.module_loading import import_string
+
+# Django's default before this project chose a hasher, its stock Argon2
+# parameters, and the tuned Argon2 used when PASSWORD_HASHER=argon2.
+DEFAULT_HASHERS = [
+    'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'accounts.hashers.TunedArgon2PasswordHasher',
+]
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure password verifications per second on a single core for each hasher. '
+        'A login costs one verification, so this is the login throughput ceiling per core.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seconds', type=float, default=3.0, help='Time spent measuring each hasher.')
+        parser.add_argument('hashers', nargs='*', default=DEFAULT_HASHERS,
+                            help='Dotted paths of hashers to compare.')
+
+    def handle(self, *args, **options):
+        password = 'correct horse battery staple'
+        for path in options['hashers']:
+            hasher = import_string(path)()
+            try:
+                encoded = hasher.encode(password, hasher.salt())
+            except ValueError as exc:  # optional library missing
+                self.stdout.write(self.style.WARNING(f'{path}: skipped ({exc})'))
+                continue
+
+            checks = 0
+            start = time.perf_counter()
+            deadline = start + options['seconds']
+            while time.perf_counter() < deadline:
+                hasher.verify(password, encoded)
+                checks += 1
+            elapsed = time.perf_counter() - start
+            self.stdout.write(self.style.SUCCESS(
+                f'{path}: {checks / elapsed:.1f} logins/s per core ({elapsed / checks * 1000:.1f} ms each)'
+            ))
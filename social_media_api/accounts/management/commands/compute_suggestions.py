@@ -0,0 +1,81 @@
+import heapq
+from array import array
+from collections import Counter
+from itertools import chain
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from accounts.models import FollowSuggestion
+
+User = get_user_model()
+Follow = User.following.through
+
+
+class Command(BaseCommand):
+    help = (
+        'Rank friends-of-friends for every user who follows someone and store the '
+        'top-K as FollowSuggestion rows for the suggestions endpoint.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top-k', type=int, default=getattr(settings, 'SUGGESTIONS_TOP_K', 20))
+        parser.add_argument('--chunk-size', type=int, default=10000,
+                            help='Join-table rows fetched, and users written, per round trip.')
+
+    def handle(self, *args, **options):
+        started = timezone.now()
+        following = self.load_following(options['chunk_size'])
+
+        written = 0
+        batch = []
+        for user_id in following:
+            batch.extend(self.suggest(user_id, following, options['top_k'], started))
+            if len(batch) >= options['chunk_size']:
+                written += self.write(batch)
+                batch = []
+        written += self.write(batch)
+
+        # Users who stopped following everyone keep no stale suggestions.
+        FollowSuggestion.objects.filter(computed_at__lt=started).delete()
+        self.stdout.write(self.style.SUCCESS(
+            f'Stored {written} suggestion(s) for {len(following)} user(s).'
+        ))
+
+    def load_following(self, chunk_size):
+        """Stream the join table into ``{user_id: array of followed ids}``."""
+        following = {}
+        edges = Follow.objects.order_by().values_list('from_user_id', 'to_user_id')
+        for from_id, to_id in edges.iterator(chunk_size=chunk_size):
+            ids = following.get(from_id)
+            if ids is None:
+                ids = following[from_id] = array('q')
+            ids.append(to_id)
+        return following
+
+    def suggest(self, user_id, following, top_k, computed_at):
+        followed = following[user_id]
+        # Counter's C counting loop tallies every second-degree edge at once.
+        scores = Counter(chain.from_iterable(following.get(other, ()) for other in followed))
+        scores.pop(user_id, None)
+        for other in followed:
+            scores.pop(other, None)
+        # Highest score first, lower user id first on ties so reruns are stable.
+        best = heapq.nsmallest(top_k, scores.items(), key=lambda item: (-item[1], item[0]))
+        return [
+            FollowSuggestion(user_id=user_id, suggested_id=suggested_id, score=score,
+                             rank=rank, computed_at=computed_at)
+            for rank, (suggested_id, score) in enumerate(best, start=1)
+        ]
+
+    def write(self, suggestions):
+        if not suggestions:
+            return 0
+        user_ids = {suggestion.user_id for suggestion in suggestions}
+        with transaction.atomic():
+            FollowSuggestion.objects.filter(user_id__in=user_ids).delete()
+            FollowSuggestion.objects.bulk_create(suggestions)
+        return len(suggestions)
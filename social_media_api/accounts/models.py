@@ -7,19 +7,46 @@ class User(AbstractUser):
     profile_picture = models.ImageField(upload_to='profile_pics/', blank=True, null=True)
     # following: users that this user follows
     following = models.ManyToManyField('self', symmetrical=False, related_name='followers', blank=True)
+    # Denormalized sizes of the two sides of `following`, kept current by
+    # follow/unfollow; `manage.py reconcile_counters` repairs any drift.
+    followers_count = models.PositiveIntegerField(default=0)
+    following_count = models.PositiveIntegerField(default=0)
 
     def __str__(self):
         return self.username
     
     def follow(self, user):
-        """Follow a user"""
-        if user != self:
-            self.following.add(user)
+        """Follow a user. Returns True if a new follow was created."""
+        from .follows import follow_many
+        return bool(follow_many(self.pk, [user.pk]))
     
     def unfollow(self, user):
-        """Unfollow a user"""
-        self.following.remove(user)
+        """Unfollow a user. Returns True if an existing follow was removed."""
+        from .follows import unfollow_many
+        return bool(unfollow_many(self.pk, [user.pk]))
     
     def is_following(self, user):
-        """Check if this user is following another user"""
-        return self.following.filter(id=user.id).exists()
+        """Check if this user is following another user (see accounts/graph.py)"""
+        from . import graph
+        return graph.is_following(self.pk, user.pk)
+
+
+class FollowSuggestion(models.Model):
+    """Precomputed "people you may know" entry, written by `manage.py compute_suggestions`."""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='follow_suggestions')
+    suggested = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    # Number of accounts `user` follows that also follow `suggested`.
+    score = models.PositiveIntegerField()
+    rank = models.PositiveSmallIntegerField()
+    computed_at = models.DateTimeField()
+
+    class Meta:
+        unique_together = ('user', 'suggested')
+        indexes = [
+            # The suggestions endpoint reads one user's rows in rank order.
+            models.Index(fields=['user', 'rank'], name='suggestion_user_rank_idx'),
+        ]
+        ordering = ['rank']
+
+    def __str__(self):
+        return f'{self.user} -> {self.suggested} ({self.score})'
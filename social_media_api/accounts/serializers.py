@@ -1,31 +1,64 @@
+from django.conf import settings
 from django.contrib.auth import authenticate, get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import IntegrityError, models, transaction
 from rest_framework import serializers
 from rest_framework.authtoken.models import Token
-from .models import User
+from . import graph
+from .limits import credential_check_slot
+from .models import FollowSuggestion, User
+
+
+def _is_following_cache(request):
+    """Per-request ``{user_id: bool}`` map of who ``request.user`` follows."""
+    cache = getattr(request, '_is_following_cache', None)
+    if cache is None:
+        cache = request._is_following_cache = {}
+    return cache
+
+
+class UserListSerializer(serializers.ListSerializer):
+    """Resolve ``is_following`` for a whole page of users in one graph lookup."""
+
+    def to_representation(self, data):
+        users = list(data.all() if isinstance(data, models.Manager) else data)
+        request = self.context.get('request')
+        if request and request.user.is_authenticated:
+            cache = _is_following_cache(request)
+            missing = [user.pk for user in users if user.pk not in cache]
+            if missing:
+                cache.update(graph.following_map(request.user.pk, missing))
+        return super().to_representation(users)
 
 
 class UserSerializer(serializers.ModelSerializer):
-    followers_count = serializers.SerializerMethodField()
-    following_count = serializers.SerializerMethodField()
     is_following = serializers.SerializerMethodField()
     
     class Meta:
         model = User
         fields = ('id', 'username', 'email', 'bio', 'profile_picture', 'followers_count', 'following_count', 'is_following')
-    
-    def get_followers_count(self, obj):
-        return obj.followers.count()
-    
-    def get_following_count(self, obj):
-        return obj.following.count()
+        read_only_fields = ('followers_count', 'following_count')
+        list_serializer_class = UserListSerializer
     
     def get_is_following(self, obj):
         request = self.context.get('request')
         if request and request.user.is_authenticated:
-            return request.user.is_following(obj)
+            cache = _is_following_cache(request)
+            if obj.pk not in cache:
+                cache[obj.pk] = graph.is_following(request.user.pk, obj.pk)
+            return cache[obj.pk]
         return False
 
 
+class FollowSuggestionSerializer(serializers.ModelSerializer):
+    user = UserSerializer(source='suggested', read_only=True)
+    mutual_count = serializers.IntegerField(source='score', read_only=True)
+
+    class Meta:
+        model = FollowSuggestion
+        fields = ('user', 'mutual_count', 'rank')
+
+
 class RegisterSerializer(serializers.ModelSerializer):
     password = serializers.CharField(write_only=True)
 
@@ -34,12 +67,22 @@ class RegisterSerializer(serializers.ModelSerializer):
         fields = ('username', 'email', 'password')
 
     def create(self, validated_data):
-        user = get_user_model().objects.create_user(
-            username=validated_data['username'],
-            email=validated_data.get('email', ''),
-            password=validated_data['password']
-        )
-        Token.objects.create(user=user)
+        # Hash first so the transaction is not held open during the slow part.
+        with credential_check_slot():
+            password = make_password(validated_data['password'])
+        UserModel = get_user_model()
+        try:
+            with transaction.atomic():
+                user = UserModel.objects.create(
+                    username=UserModel.normalize_username(validated_data['username']),
+                    email=UserModel.objects.normalize_email(validated_data.get('email', '')),
+                    password=password,
+                )
+                # Also caches the token as user.auth_token for RegisterView.
+                Token.objects.create(user=user)
+        except IntegrityError:
+            # Lost a race with a concurrent registration of the same username.
+            raise serializers.ValidationError({'username': ['A user with that username already exists.']})
         return user
 
 
@@ -48,13 +91,24 @@ class LoginSerializer(serializers.Serializer):
     password = serializers.CharField(write_only=True)
 
     def validate(self, data):
-        user = authenticate(username=data.get('username'), password=data.get('password'))
+        # authenticate() also upgrades the stored hash when PASSWORD_HASHERS changed.
+        with credential_check_slot():
+            user = authenticate(username=data.get('username'), password=data.get('password'))
         if not user:
             raise serializers.ValidationError('Invalid credentials')
         data['user'] = user
         return data
 
 
+class FollowBatchSerializer(serializers.Serializer):
+    """User IDs for the batch follow endpoint"""
+    user_ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=getattr(settings, 'FOLLOW_BATCH_LIMIT', 500),
+    )
+
+
 class FollowSerializer(serializers.Serializer):
     """Serializer for follow/unfollow actions"""
     user_id = serializers.IntegerField()
@@ -0,0 +1,43 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from . import graph
+from social_media_api.authentication import invalidate_token, invalidate_user
+
+User = get_user_model()
+Follow = User.following.through
+
+
+@receiver(m2m_changed, sender=Follow)
+def sync_graph_with_follows(sender, instance, action, reverse, pk_set, **kwargs):
+    """Drop the cached follow-graph sets a follow/unfollow changes."""
+    if action in ('post_add', 'post_remove'):
+        if reverse:
+            # author.followers.add(*users)
+            for follower_id in pk_set:
+                graph.record_edges(follower_id, [instance.pk])
+        else:
+            graph.record_edges(instance.pk, pk_set)
+    elif action == 'pre_clear':
+        # pk_set is not provided for clear(); remember who is affected.
+        column = 'from_user_id' if reverse else 'to_user_id'
+        owner = 'to_user_id' if reverse else 'from_user_id'
+        instance._graph_cleared_ids = list(
+            Follow.objects.filter(**{owner: instance.pk}).values_list(column, flat=True)
+        )
+    elif action == 'post_clear':
+        graph.invalidate(instance.pk, *getattr(instance, '_graph_cleared_ids', []))
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def drop_cached_user(sender, instance, **kwargs):
+    """Password changes and deactivation must reach the auth cache."""
+    invalidate_user(instance.pk)
+
+
+@receiver(post_delete, sender=Token)
+def drop_cached_token(sender, instance, **kwargs):
+    invalidate_token(instance.key)
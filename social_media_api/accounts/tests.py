@@ -1,4 +1,25 @@
-from django.test import TestCase
+import csv
+import os
+import tempfile
+from io import StringIO
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth import authenticate, get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIRequestFactory, APITestCase, force_authenticate
+
+from . import graph, limits
+from .models import FollowSuggestion
+from .views import AsyncProfileView
+
+User = get_user_model()
 
 # Placeholder tests. Add tests for registration/login later.
 
@@ -6,3 +27,348 @@ from django.test import TestCase
 class AccountsSmokeTest(TestCase):
     def test_smoke(self):
         self.assertTrue(True)
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class UserListIsFollowingTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.viewer = User.objects.create_user(username='viewer', password='pass12345')
+        self.client.force_authenticate(user=self.viewer)
+
+    def count_list_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('user-list'))
+        self.assertEqual(response.status_code, 200)
+        return len(queries), response.data['results']
+
+    def test_is_following_uses_one_query_per_page(self):
+        users = [User.objects.create_user(username=f'user{i}', password='x') for i in range(2)]
+        self.viewer.follow(users[0])
+        self.count_list_queries()  # warm the cached follow graph
+        small, _ = self.count_list_queries()
+
+        users += [User.objects.create_user(username=f'user{i}', password='x') for i in range(2, 9)]
+        large, results = self.count_list_queries()
+
+        self.assertEqual(len(results), 10)
+        self.assertEqual(small, large)
+        following = {row['username']: row['is_following'] for row in results}
+        self.assertTrue(following['user0'])
+        self.assertFalse(following['user1'])
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class ProfileConditionalGetTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='viewer', password='pass12345')
+        self.client.force_authenticate(user=self.user)
+
+    def test_unchanged_profile_is_304_with_a_single_query(self):
+        etag = self.client.get(reverse('profile'))['ETag']
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('profile'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(len(queries), 1)
+
+    def test_edited_profile_gets_a_new_etag(self):
+        etag = self.client.get(reverse('profile'))['ETag']
+        User.objects.filter(pk=self.user.pk).update(bio='Hello')
+        self.user.refresh_from_db()
+        response = self.client.get(reverse('profile'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['bio'], 'Hello')
+
+    def get_async(self, **headers):
+        request = APIRequestFactory().get(reverse('profile'), **headers)
+        force_authenticate(request, user=self.user)
+        return async_to_sync(AsyncProfileView.as_view())(request)
+
+    def test_async_view_matches_sync_view(self):
+        expected = self.client.get(reverse('profile'))
+        response = self.get_async()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, expected.data)
+        self.assertEqual(response['ETag'], expected['ETag'])
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.get_async(HTTP_IF_NONE_MATCH=expected['ETag'])
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(len(queries), 1)
+
+
+class FollowGraphTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.alice, self.bob, self.carol = (
+            User.objects.create_user(username=name, password='x') for name in ('alice', 'bob', 'carol')
+        )
+        self.alice.follow(self.bob)
+        self.bob.follow(self.alice)
+        self.alice.follow(self.carol)
+
+    def test_lookups_are_served_from_cache_once_loaded(self):
+        graph.mutual_ids(self.alice.pk)
+        graph.following_ids(self.bob.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(graph.mutual_ids(self.alice.pk), {self.bob.pk})
+            self.assertEqual(graph.following_map(self.alice.pk, [self.bob.pk, self.carol.pk, 999]),
+                             {self.bob.pk: True, self.carol.pk: True, 999: False})
+            self.assertTrue(graph.is_mutual(self.alice.pk, self.bob.pk))
+            self.assertFalse(self.bob.is_following(self.carol))
+
+    def test_follow_and_unfollow_drop_the_affected_sets(self):
+        graph.mutual_ids(self.carol.pk)
+        graph.follower_ids(self.bob.pk)
+        graph.following_ids(self.bob.pk)
+        self.carol.follow(self.alice)
+        self.alice.unfollow(self.bob)
+        self.assertEqual(graph.mutual_ids(self.carol.pk), {self.alice.pk})
+        self.assertEqual(graph.follower_ids(self.bob.pk), set())
+        with self.assertNumQueries(0):
+            # Untouched sets stay cached.
+            self.assertEqual(graph.following_ids(self.bob.pk), {self.alice.pk})
+
+    def test_rolled_back_follow_leaves_no_edge_behind(self):
+        graph.following_ids(self.carol.pk)
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            self.carol.follow(self.bob)
+            raise RuntimeError
+        self.assertEqual(graph.following_ids(self.carol.pk), set())
+
+    def test_set_reloaded_before_commit_is_dropped_on_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                self.carol.follow(self.bob)
+                # A concurrent read caches the pre-commit edges.
+                cache.set(graph._key(graph.FOLLOWING, self.carol.pk), set(), 60)
+        self.assertEqual(graph.following_ids(self.carol.pk), {self.bob.pk})
+
+    def test_reverse_add_and_clear(self):
+        graph.following_ids(self.carol.pk)
+        graph.follower_ids(self.bob.pk)
+        self.bob.followers.add(self.carol)
+        self.assertEqual(graph.following_ids(self.carol.pk), {self.bob.pk})
+
+        self.bob.followers.clear()
+        self.assertEqual(graph.following_ids(self.carol.pk), set())
+        self.assertEqual(graph.follower_ids(self.bob.pk), set())
+
+    @override_settings(GRAPH_MAX_CACHED_IDS=1)
+    def test_oversized_sides_fall_back_to_sql(self):
+        self.assertEqual(graph.following_ids(self.alice.pk), {self.bob.pk, self.carol.pk})
+        self.assertEqual(graph.mutual_ids(self.alice.pk), {self.bob.pk})
+        self.assertFalse(graph.is_following(self.alice.pk, 999))
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class SuggestionTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.me, self.a, self.b, self.c, self.d = (
+            User.objects.create_user(username=name, password='x') for name in ('me', 'a', 'b', 'c', 'd')
+        )
+        for follower, followee in [(self.me, self.a), (self.me, self.b), (self.a, self.c),
+                                   (self.a, self.d), (self.b, self.c), (self.b, self.me)]:
+            follower.follow(followee)
+        self.client.force_authenticate(user=self.me)
+
+    def compute(self):
+        call_command('compute_suggestions', top_k=5, chunk_size=2, stdout=StringIO())
+
+    def test_friends_of_friends_ranked_by_mutual_count(self):
+        self.compute()
+        response = self.client.get(reverse('user-suggestions'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([(row['user']['username'], row['mutual_count']) for row in response.data],
+                         [('c', 2), ('d', 1)])
+
+    def test_newly_followed_and_stale_suggestions_are_dropped(self):
+        self.compute()
+        self.me.follow(self.c)
+        response = self.client.get(reverse('user-suggestions'))
+        self.assertEqual([row['user']['username'] for row in response.data], ['d'])
+
+        self.a.unfollow(self.d)
+        self.compute()
+        self.assertFalse(FollowSuggestion.objects.filter(user=self.me).exists())
+
+
+@override_settings(SECURE_SSL_REDIRECT=False, AUTH_TOKEN_CACHE_TIMEOUT=300)
+class CachedTokenAuthenticationTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='viewer', password='pass12345')
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def auth_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('user-suggestions'))
+        return response.status_code, sum('authtoken_token' in q['sql'] for q in queries)
+
+    def test_warm_requests_skip_the_token_lookup(self):
+        self.assertEqual(self.auth_queries(), (200, 1))
+        self.assertEqual(self.auth_queries(), (200, 0))
+
+    def test_logout_revokes_the_cached_token(self):
+        self.auth_queries()
+        self.assertEqual(self.client.post(reverse('logout')).status_code, 204)
+        self.assertEqual(self.auth_queries()[0], 401)
+
+    def test_deactivation_and_password_change_drop_the_snapshot(self):
+        self.auth_queries()
+        self.user.set_password('new-pass-123')
+        self.user.save()
+        self.assertEqual(self.auth_queries(), (200, 1))
+
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.auth_queries()[0], 401)
+
+    def test_snapshot_cached_before_commit_is_dropped_on_commit(self):
+        active = User.objects.get(pk=self.user.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                self.user.is_active = False
+                self.user.save()
+                # A concurrent request re-caches the old row before the commit.
+                cache.set(f'auth:user:{self.user.pk}', active, 300)
+        self.assertEqual(self.auth_queries()[0], 401)
+
+
+@override_settings(SECURE_SSL_REDIRECT=False, PASSWORD_HASHERS=[
+    'accounts.hashers.TunedArgon2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+])
+class PasswordHashingTests(APITestCase):
+    def login(self, username, password):
+        return self.client.post(reverse('login'), {'username': username, 'password': password})
+
+    def test_register_hashes_with_the_preferred_hasher(self):
+        self.client.post(reverse('register'), {'username': 'new', 'password': 'pass12345'})
+        self.assertTrue(User.objects.get(username='new').password.startswith('argon2$'))
+
+    def test_login_upgrades_legacy_hashes(self):
+        User.objects.create(username='legacy', password=make_password('pass12345', hasher='pbkdf2_sha256'))
+        self.assertEqual(self.login('legacy', 'pass12345').status_code, 200)
+        self.assertTrue(User.objects.get(username='legacy').password.startswith('argon2$'))
+
+    @override_settings(LOGIN_MAX_CONCURRENT_CHECKS=1, LOGIN_QUEUE_TIMEOUT=0)
+    def test_login_is_throttled_when_every_slot_is_busy(self):
+        User.objects.create_user(username='busy', password='pass12345')
+        limits._semaphore = None
+        self.addCleanup(setattr, limits, '_semaphore', None)
+        with limits.credential_check_slot():
+            self.assertEqual(self.login('busy', 'pass12345').status_code, 429)
+        self.assertEqual(self.login('busy', 'pass12345').status_code, 200)
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class RegistrationTests(APITestCase):
+    def test_register_writes_user_and_token_once(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(reverse('register'), {'username': 'new', 'password': 'pass12345'})
+        self.assertEqual(response.status_code, 201)
+        token_queries = [q['sql'] for q in queries if 'authtoken_token' in q['sql']]
+        self.assertEqual(len(token_queries), 1)
+        self.assertTrue(token_queries[0].startswith('INSERT'))
+        self.assertEqual(Token.objects.get(user__username='new').key, response.data['token'])
+
+    def test_duplicate_username_is_rejected(self):
+        self.client.post(reverse('register'), {'username': 'new', 'password': 'pass12345'})
+        response = self.client.post(reverse('register'), {'username': 'new', 'password': 'pass12345'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Token.objects.count(), 1)
+
+
+class ImportUsersTests(TestCase):
+    def write_csv(self, rows):
+        handle, path = tempfile.mkstemp(suffix='.csv')
+        with os.fdopen(handle, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=['username', 'email', 'password', 'password_hash'])
+            writer.writeheader()
+            writer.writerows(rows)
+        self.addCleanup(os.remove, path)
+        return path
+
+    def test_import_creates_users_with_tokens(self):
+        User.objects.create_user(username='taken', password='x')
+        path = self.write_csv([
+            {'username': 'plain', 'email': 'plain@EXAMPLE.com', 'password': 'pass12345'},
+            {'username': 'hashed', 'password_hash': make_password('secret123')},
+            {'username': 'taken', 'password': 'other'},
+            {'username': 'plain', 'password': 'duplicate'},
+        ])
+        tokens_out = path + '.tokens'
+        self.addCleanup(os.remove, tokens_out)
+
+        out = StringIO()
+        call_command('import_users', path, batch_size=2, workers=2, tokens_out=tokens_out, stdout=out)
+
+        self.assertIn('Created 2 user(s); skipped 2', out.getvalue())
+        self.assertEqual(User.objects.get(username='plain').email, 'plain@example.com')
+        self.assertIsNotNone(authenticate(username='plain', password='pass12345'))
+        self.assertIsNotNone(authenticate(username='hashed', password='secret123'))
+        with open(tokens_out, newline='') as f:
+            exported = dict(csv.reader(f))
+        self.assertEqual(exported, dict(Token.objects.filter(user__username__in=['plain', 'hashed'])
+                                        .values_list('user__username', 'key')))
+
+
+@override_settings(SECURE_SSL_REDIRECT=False, NOTIFICATIONS_ASYNC=False)
+class FollowEndpointTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.me, self.a, self.b = (
+            User.objects.create_user(username=name, password='x') for name in ('me', 'a', 'b')
+        )
+        self.client.force_authenticate(user=self.me)
+
+    def follow(self, user_id):
+        return self.client.post(reverse('follow-user', args=[user_id]))
+
+    def counts(self, user):
+        user.refresh_from_db()
+        return user.followers_count, user.following_count
+
+    def test_follow_touches_the_join_table_once(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.follow(self.a.pk)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('You are now following a', response.data['message'])
+        follow_queries = [q['sql'] for q in queries if 'accounts_user_following' in q['sql']]
+        self.assertEqual(len(follow_queries), 1)
+        self.assertTrue(follow_queries[0].startswith('INSERT'))
+        self.assertEqual((self.counts(self.me), self.counts(self.a)), ((0, 1), (1, 0)))
+        self.assertTrue(graph.is_following(self.me.pk, self.a.pk))
+
+    def test_follow_errors(self):
+        self.follow(self.a.pk)
+        self.assertEqual(self.follow(self.a.pk).status_code, 400)
+        self.assertEqual(self.follow(self.me.pk).status_code, 400)
+        self.assertEqual(self.follow(self.b.pk + 100).status_code, 404)
+        self.assertEqual(self.counts(self.a), (1, 0))
+
+    def test_unfollow(self):
+        self.follow(self.a.pk)
+        response = self.client.post(reverse('unfollow-user', args=[self.a.pk]))
+        self.assertEqual(response.data['message'], 'You have unfollowed a')
+        self.assertEqual(self.client.post(reverse('unfollow-user', args=[self.a.pk])).status_code, 400)
+        self.assertEqual((self.counts(self.me), self.counts(self.a)), ((0, 0), (0, 0)))
+        self.assertFalse(graph.is_following(self.me.pk, self.a.pk))
+
+    def test_batch_follow(self):
+        self.follow(self.a.pk)
+        missing = self.b.pk + 100
+        response = self.client.post(reverse('follow-users'),
+                                    {'user_ids': [self.a.pk, self.b.pk, self.me.pk, missing, self.b.pk]},
+                                    format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, {'followed': [self.b.pk], 'skipped': sorted([self.a.pk, self.me.pk, missing])})
+        self.assertEqual(self.counts(self.me), (0, 2))
+        self.assertEqual(self.b.notifications.count(), 1)
+
+    def test_batch_follow_rejects_empty_lists(self):
+        response = self.client.post(reverse('follow-users'), {'user_ids': []}, format='json')
+        self.assertEqual(response.status_code, 400)
@@ -1,12 +1,24 @@
+from django.conf import settings
 from django.urls import path
-from .views import RegisterView, LoginView, ProfileView, follow_user, unfollow_user, UserListView, UserDetailView
+from .views import (
+    RegisterView, LoginView, ProfileView, AsyncProfileView, follow_user, unfollow_user, UserListView,
+    UserDetailView, SuggestionListView, logout_user, follow_users,
+)
+
+if getattr(settings, 'ASYNC_VIEWS', False):
+    profile_view = AsyncProfileView.as_view()
+else:
+    profile_view = ProfileView.as_view()
 
 urlpatterns = [
     path('register/', RegisterView.as_view(), name='register'),
     path('login/', LoginView.as_view(), name='login'),
-    path('profile/', ProfileView.as_view(), name='profile'),
+    path('logout/', logout_user, name='logout'),
+    path('profile/', profile_view, name='profile'),
     path('users/', UserListView.as_view(), name='user-list'),
+    path('users/suggestions/', SuggestionListView.as_view(), name='user-suggestions'),
     path('users/<int:pk>/', UserDetailView.as_view(), name='user-detail'),
+    path('follow/', follow_users, name='follow-users'),
     path('follow/<int:user_id>/', follow_user, name='follow-user'),
     path('unfollow/<int:user_id>/', unfollow_user, name='unfollow-user'),
 ]
@@ -5,7 +5,16 @@ from rest_framework.authtoken.models import Token
 from rest_framework.decorators import api_view, permission_classes
 from django.shortcuts import get_object_or_404
 from django.contrib.auth import get_user_model
-from .serializers import RegisterSerializer, LoginSerializer, UserSerializer, FollowSerializer
+from . import graph
+from .follows import follow_many, unfollow_many
+from .models import FollowSuggestion
+from .serializers import (
+    RegisterSerializer, LoginSerializer, UserSerializer, FollowSerializer, FollowSuggestionSerializer,
+    FollowBatchSerializer, _is_following_cache,
+)
+from notifications.dispatcher import notify
+from social_media_api.asyncviews import AsyncAPIView
+from social_media_api.conditional import ConditionalRetrieveMixin, is_not_modified, make_etag
 
 CustomUser = get_user_model()
 
@@ -18,8 +27,7 @@ class RegisterView(generics.CreateAPIView):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         user = serializer.save()
-        token, _ = Token.objects.get_or_create(user=user)
-        return Response({'token': token.key}, status=status.HTTP_201_CREATED)
+        return Response({'token': user.auth_token.key}, status=status.HTTP_201_CREATED)
 
 
 class LoginView(generics.GenericAPIView):
@@ -34,43 +42,94 @@ class LoginView(generics.GenericAPIView):
         return Response({'token': token.key})
 
 
-class ProfileView(generics.RetrieveAPIView):
+class ProfileView(ConditionalRetrieveMixin, generics.RetrieveAPIView):
     serializer_class = UserSerializer
+    # Columns the profile renders; request.user may be a cached snapshot
+    # (see social_media_api/authentication.py), so they are re-read.
+    validator_fields = ('pk', 'username', 'email', 'bio', 'profile_picture', 'followers_count', 'following_count')
 
     def get_object(self):
-        return self.request.user
+        return CustomUser.objects.get(pk=self.request.user.pk)
+
+    def get_validators(self, request, *args, **kwargs):
+        row = CustomUser.objects.filter(pk=request.user.pk).values_list(*self.validator_fields).first()
+        return row, None
+
+
+class AsyncProfileView(AsyncAPIView, ProfileView):
+    """``ProfileView`` for the ASGI serving mode (see social_media_api/asyncviews.py)."""
+
+    async def get(self, request, *args, **kwargs):
+        row = await CustomUser.objects.filter(pk=request.user.pk).values_list(*self.validator_fields).afirst()
+        etag = make_etag(request.accepted_media_type, *row)
+        if is_not_modified(request, etag):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            user = await CustomUser.objects.aget(pk=request.user.pk)
+            # Nobody follows themselves, so skip the graph lookup.
+            _is_following_cache(request)[user.pk] = False
+            response = Response(self.get_serializer(user).data)
+        response['ETag'] = etag
+        return response
+
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def logout_user(request):
+    """Revoke the current user's token"""
+    # Deleting the token also drops it from the authentication cache.
+    Token.objects.filter(user=request.user).delete()
+    return Response(status=status.HTTP_204_NO_CONTENT)
 
 
 @api_view(['POST'])
 @permission_classes([permissions.IsAuthenticated])
 def follow_user(request, user_id):
     """Follow a user"""
-    user_to_follow = get_object_or_404(CustomUser, id=user_id)
-    
-    if user_to_follow == request.user:
+    if user_id == request.user.pk:
         return Response({'error': 'You cannot follow yourself'}, status=status.HTTP_400_BAD_REQUEST)
     
-    if request.user.is_following(user_to_follow):
+    # The insert itself reports whether a follow was created (see accounts/follows.py).
+    followed = follow_many(request.user.pk, [user_id])
+    if not followed:
+        get_object_or_404(CustomUser, id=user_id)
         return Response({'error': 'You are already following this user'}, status=status.HTTP_400_BAD_REQUEST)
     
-    request.user.follow(user_to_follow)
-    return Response({'message': f'You are now following {user_to_follow.username}'}, status=status.HTTP_200_OK)
+    notify(user_id, request.user, 'started following you')
+    return Response({'message': f'You are now following {followed[user_id]}'}, status=status.HTTP_200_OK)
+
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def follow_users(request):
+    """Follow several users at once, e.g. from an imported contact list"""
+    serializer = FollowBatchSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    user_ids = set(serializer.validated_data['user_ids'])
+    
+    followed = follow_many(request.user.pk, user_ids)
+    for followed_id in followed:
+        notify(followed_id, request.user, 'started following you')
+    return Response({
+        'followed': sorted(followed),
+        # Yourself, unknown users and users you already follow.
+        'skipped': sorted(user_ids - set(followed)),
+    }, status=status.HTTP_200_OK)
 
 
 @api_view(['POST'])
 @permission_classes([permissions.IsAuthenticated])
 def unfollow_user(request, user_id):
     """Unfollow a user"""
-    user_to_unfollow = get_object_or_404(CustomUser, id=user_id)
-    
-    if user_to_unfollow == request.user:
+    if user_id == request.user.pk:
         return Response({'error': 'You cannot unfollow yourself'}, status=status.HTTP_400_BAD_REQUEST)
     
-    if not request.user.is_following(user_to_unfollow):
+    unfollowed = unfollow_many(request.user.pk, [user_id])
+    if not unfollowed:
+        get_object_or_404(CustomUser, id=user_id)
         return Response({'error': 'You are not following this user'}, status=status.HTTP_400_BAD_REQUEST)
     
-    request.user.unfollow(user_to_unfollow)
-    return Response({'message': f'You have unfollowed {user_to_unfollow.username}'}, status=status.HTTP_200_OK)
+    return Response({'message': f'You have unfollowed {unfollowed[user_id]}'}, status=status.HTTP_200_OK)
 
 
 class UserListView(generics.ListAPIView):
@@ -80,6 +139,19 @@ class UserListView(generics.ListAPIView):
     permission_classes = [permissions.IsAuthenticated]
 
 
+class SuggestionListView(generics.ListAPIView):
+    """People the current user may know, precomputed by `manage.py compute_suggestions`"""
+    serializer_class = FollowSuggestionSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    pagination_class = None  # at most SUGGESTIONS_TOP_K rows
+
+    def get_queryset(self):
+        suggestions = FollowSuggestion.objects.filter(user=self.request.user).select_related('suggested')
+        # Skip accounts followed since the last batch run (cached graph lookup).
+        followed = graph.following_ids(self.request.user.pk)
+        return [suggestion for suggestion in suggestions if suggestion.suggested_id not in followed]
+
+
 class UserDetailView(generics.RetrieveAPIView):
     """Get details of a specific user"""
     queryset = CustomUser.objects.all()
@@ -1,11 +1,110 @@
 import multiprocessing
+import os
+
+# Everything below can be set from the environment. The defaults come from
+# the CPUs this process may run on and, when DB_MAX_CONNECTIONS is set, from
+# the database connections this instance may use:
+#
+#   SERVER_MODE                  wsgi (default) or asgi
+#   WEB_CONCURRENCY              worker processes
+#   GUNICORN_THREADS             threads per WSGI worker; above 1 selects gthread workers
+#   GUNICORN_WORKER_CONNECTIONS  requests in flight per ASGI worker
+#   GUNICORN_KEEPALIVE           seconds an idle keep-alive connection stays open
+#   DB_MAX_CONNECTIONS           database connections this instance may open
+#   DB_POOL, DB_POOL_MAX_SIZE    share pooled connections within each worker
+#
+# A sync worker holds one database connection, a gthread worker one per
+# thread and an ASGI worker one per request in flight, unless DB_POOL is set
+# and they share DB_POOL_MAX_SIZE pooled connections. The total is fitted
+# into DB_MAX_CONNECTIONS. when_ready() also asks the database for its own
+# limit and logs a warning when the workers could exceed it.
+
+
+def _env_int(name, default):
+    value = os.environ.get(name)
+    return int(value) if value else default
+
+
+def _available_cpus():
+    # Containers often pin the process to fewer CPUs than the host reports.
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return multiprocessing.cpu_count()
+
+
+cpus = _available_cpus()
+db_max_connections = _env_int("DB_MAX_CONNECTIONS", 0)
+threads = _env_int("GUNICORN_THREADS", 1)
+worker_connections = _env_int("GUNICORN_WORKER_CONNECTIONS", 1000)
+db_pool = os.environ.get("DB_POOL", "False").lower() == "true"
+pool_max_size = _env_int("DB_POOL_MAX_SIZE", 10)
+
+# SERVER_MODE=asgi serves social_media_api.asgi with uvicorn workers, each of
+# which interleaves many requests on one event loop; the default sync workers
+# handle one request at a time. Django reads the same variable to route the
+# hot read endpoints to their async views.
+server_mode = os.environ.get("SERVER_MODE", "wsgi").lower()
+
+if server_mode == "asgi":
+    wsgi_app = "social_media_api.asgi:application"
+    worker_class = "social_media_api.workers.UvicornWorker"
+    # One event loop per CPU is enough; more processes only add connections.
+    workers = _env_int("WEB_CONCURRENCY", cpus)
+elif threads > 1:
+    wsgi_app = "social_media_api.wsgi:application"
+    worker_class = "gthread"
+    workers = _env_int("WEB_CONCURRENCY", cpus + 1)
+else:
+    wsgi_app = "social_media_api.wsgi:application"
+    worker_class = "sync"
+    workers = _env_int("WEB_CONCURRENCY", cpus * 2 + 1)
+
+if db_max_connections:
+    workers = min(workers, db_max_connections)
+    share = db_max_connections // workers
+    if db_pool:
+        # Threads and requests beyond the pool wait for a connection instead.
+        pool_max_size = min(pool_max_size, share)
+    elif server_mode == "asgi":
+        worker_connections = min(worker_connections, share)
+    else:
+        threads = min(threads, share)
+
+if server_mode == "asgi":
+    connections_per_worker = worker_connections
+else:
+    connections_per_worker = threads
+if db_pool:
+    if server_mode != "asgi":
+        # A WSGI worker never uses more connections than it has threads.
+        pool_max_size = min(pool_max_size, threads)
+    connections_per_worker = pool_max_size
+    os.environ["DB_POOL_MAX_SIZE"] = str(pool_max_size)  # read by settings.py
 
 bind = "0.0.0.0:8000"
-workers = multiprocessing.cpu_count() * 2 + 1
-worker_class = "sync"
-worker_connections = 1000
 max_requests = 1000
 max_requests_jitter = 100
 timeout = 30
-keepalive = 2
+keepalive = _env_int("GUNICORN_KEEPALIVE", 2)
 preload_app = True
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "social_media_api.settings")
+
+
+def when_ready(server):
+    import django
+
+    django.setup()  # a no-op when preload_app already loaded the project
+    from social_media_api.capacity import check_connection_budget
+
+    server.log.info(
+        "%s x %s workers, %s database connection(s) each",
+        server.num_workers, worker_class, connections_per_worker,
+    )
+    for warning in check_connection_budget(server.num_workers, connections_per_worker):
+        server.log.warning(warning)
+
+    from social_media_api.pool import close_pools
+
+    close_pools()  # workers are forked next and open their own
@@ -0,0 +1,210 @@
+"""In-process background writer for notifications.
+
+Write endpoints call ``notify()``, which hands the notification to a worker
+thread once the surrounding transaction commits. The worker drains a bounded
+queue and inserts notifications with ``bulk_create`` in batches, so a burst
+of likes turns into a handful of multi-row INSERTs instead of one INSERT per
+request. When the queue is full the notification is written synchronously
+rather than dropped. Set ``NOTIFICATIONS_ASYNC = False`` to write inline
+(useful in tests and management commands).
+
+Notifications sharing a (recipient, verb, target) within
+``NOTIFICATIONS_AGGREGATE_WINDOW`` seconds are folded into one unread row
+("X and 41 others liked your post"), so the table grows with distinct events
+rather than raw actions.
+"""
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from .models import Notification
+from .unread import invalidate_unread_count
+
+logger = logging.getLogger(__name__)
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def write_notifications(notifications, batch_size=100):
+    """Insert ``notifications`` (oldest first), aggregating where enabled."""
+    window = _setting('NOTIFICATIONS_AGGREGATE_WINDOW', 0)
+    if not window:
+        Notification.objects.bulk_create(notifications, batch_size=batch_size)
+    else:
+        _write_aggregated(notifications, window, batch_size)
+    invalidate_unread_count(*{notification.recipient_id for notification in notifications})
+
+
+def _write_aggregated(notifications, window, batch_size):
+
+    sample_size = _setting('NOTIFICATIONS_ACTOR_SAMPLE_SIZE', 5)
+    groups = {}
+    for notification in notifications:
+        key = (
+            notification.recipient_id,
+            notification.verb,
+            notification.target_content_type_id,
+            notification.target_object_id,
+        )
+        groups.setdefault(key, []).append(notification)
+
+    now = timezone.now()
+    new_rows = []
+    with transaction.atomic():
+        for (recipient_id, verb, content_type_id, object_id), group in groups.items():
+            actor_ids = []  # distinct, newest first
+            for notification in reversed(group):
+                if notification.actor_id not in actor_ids:
+                    actor_ids.append(notification.actor_id)
+
+            existing = (
+                Notification.objects.select_for_update()
+                .filter(
+                    recipient_id=recipient_id,
+                    verb=verb,
+                    target_content_type_id=content_type_id,
+                    target_object_id=object_id,
+                    read=False,
+                    timestamp__gte=now - timedelta(seconds=window),
+                )
+                .order_by('-timestamp')
+                .first()
+            )
+            if existing is None:
+                latest = group[-1]
+                latest.actor_count = len(actor_ids)
+                latest.recent_actor_ids = actor_ids[:sample_size]
+                new_rows.append(latest)
+                continue
+
+            # Actors outside the sample cannot be told apart from new ones, so
+            # actor_count is exact up to sample_size and approximate beyond.
+            sample = existing.recent_actor_ids or [existing.actor_id]
+            existing.actor_count += len([a for a in actor_ids if a not in sample])
+            existing.recent_actor_ids = (actor_ids + [a for a in sample if a not in actor_ids])[:sample_size]
+            existing.actor_id = actor_ids[0]
+            existing.timestamp = now
+            existing.save(update_fields=['actor', 'actor_count', 'recent_actor_ids', 'timestamp'])
+
+        Notification.objects.bulk_create(new_rows, batch_size=batch_size)
+
+
+class NotificationDispatcher:
+    """Bounded queue plus a daemon thread that flushes it with ``bulk_create``."""
+
+    def __init__(self, max_queue_size=10000, batch_size=100, flush_interval=0.2):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+
+    def enqueue(self, notification):
+        self._ensure_worker()
+        try:
+            self._queue.put_nowait(notification)
+        except queue.Full:
+            # Apply backpressure to the caller instead of losing the event.
+            self.write([notification])
+
+    def write(self, notifications):
+        write_notifications(notifications, batch_size=self.batch_size)
+
+    def flush(self, timeout=None):
+        """Block until everything queued so far has been written."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def _ensure_worker(self):
+        # Threads do not survive fork(), so a preloaded gunicorn master must
+        # not be the one that starts the worker.
+        if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive() or self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name='notification-dispatcher', daemon=True)
+                self._thread.start()
+
+    def _next_batch(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            try:
+                close_old_connections()
+                self.write(batch)
+            except Exception:
+                logger.exception('Failed to write %d notification(s)', len(batch))
+            finally:
+                close_old_connections()
+                for _ in batch:
+                    self._queue.task_done()
+
+
+_dispatcher = None
+_dispatcher_lock = threading.Lock()
+
+
+def get_dispatcher():
+    global _dispatcher
+    if _dispatcher is None:
+        with _dispatcher_lock:
+            if _dispatcher is None:
+                _dispatcher = NotificationDispatcher(
+                    max_queue_size=_setting('NOTIFICATIONS_QUEUE_SIZE', 10000),
+                    batch_size=_setting('NOTIFICATIONS_BATCH_SIZE', 100),
+                    flush_interval=_setting('NOTIFICATIONS_FLUSH_INTERVAL', 0.2),
+                )
+                atexit.register(_dispatcher.flush, timeout=5)
+    return _dispatcher
+
+
+def notify(recipient, actor, verb, target=None):
+    """Record that ``actor`` did ``verb`` (to ``target``) for ``recipient``.
+
+    ``recipient`` and ``actor`` may be users or user primary keys. Nothing is
+    recorded when a user acts on their own content.
+    """
+    recipient_id = getattr(recipient, 'pk', recipient)
+    actor_id = getattr(actor, 'pk', actor)
+    if recipient_id == actor_id:
+        return
+
+    notification = Notification(recipient_id=recipient_id, actor_id=actor_id, verb=verb)
+    if target is not None:
+        # get_for_model() is served from ContentType's in-process cache.
+        notification.target_content_type = ContentType.objects.get_for_model(target)
+        notification.target_object_id = target.pk
+
+    if not _setting('NOTIFICATIONS_ASYNC', True):
+        write_notifications([notification])
+        return
+    transaction.on_commit(lambda: get_dispatcher().enqueue(notification))
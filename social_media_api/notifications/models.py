@@ -15,9 +15,24 @@ class Notification(models.Model):
     target = GenericForeignKey('target_content_type', 'target_object_id')
     timestamp = models.DateTimeField(auto_now_add=True)
     read = models.BooleanField(default=False)
+    # Aggregation: repeated (recipient, verb, target) events within
+    # NOTIFICATIONS_AGGREGATE_WINDOW update one unread row in place. `actor`
+    # is the most recent actor, `actor_count` the number of distinct actors
+    # and `recent_actor_ids` a newest-first sample of them.
+    actor_count = models.PositiveIntegerField(default=1)
+    recent_actor_ids = models.JSONField(default=list, blank=True)
 
     class Meta:
         ordering = ['-timestamp']
+        indexes = [
+            models.Index(
+                fields=['recipient', 'target_content_type', 'target_object_id', 'verb'],
+                name='notification_group_idx',
+            ),
+            # Keyset pages of a user's notifications, and unread counts.
+            models.Index(fields=['recipient', '-timestamp', '-id'], name='notification_recipient_ts_idx'),
+            models.Index(fields=['recipient', 'read', '-timestamp'], name='notification_unread_idx'),
+        ]
 
     def __str__(self):
         return f'{self.actor.username} {self.verb} - {self.recipient.username}'
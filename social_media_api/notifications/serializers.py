@@ -3,14 +3,38 @@ from .models import Notification
 
 
 class NotificationSerializer(serializers.ModelSerializer):
+    """Expects ``actor`` and ``target_content_type`` to be select_related.
+
+    ``target`` is only rendered when the view passes ``expand_target`` in the
+    context, in which case it should also prefetch ``target``.
+    """
     actor_username = serializers.CharField(source='actor.username', read_only=True)
     target_type = serializers.SerializerMethodField()
+    target_id = serializers.IntegerField(source='target_object_id', read_only=True)
+    target = serializers.StringRelatedField(read_only=True)
     
     class Meta:
         model = Notification
-        fields = ['id', 'actor_username', 'verb', 'target_type', 'timestamp', 'read']
+        fields = [
+            'id', 'actor_username', 'actor_count', 'recent_actor_ids', 'verb',
+            'target_type', 'target_id', 'target', 'timestamp', 'read',
+        ]
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if not self.context.get('expand_target'):
+            self.fields.pop('target')
     
     def get_target_type(self, obj):
-        if obj.target:
-            return obj.target.__class__.__name__.lower()
+        # The content type's model name is the lowercased class name, so the
+        # target row itself never has to be loaded.
+        if obj.target_content_type_id:
+            return obj.target_content_type.model
         return None
+
+
+class MarkReadSerializer(serializers.Serializer):
+    """Selects notifications to mark read: explicit ``ids``, everything up to
+    and including ``up_to``, or (when both are omitted) all of them."""
+    ids = serializers.ListField(child=serializers.IntegerField(), required=False, max_length=1000)
+    up_to = serializers.IntegerField(required=False)
@@ -1,3 +1,176 @@
-from django.test import TestCase
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIRequestFactory, APITestCase, force_authenticate
 
-# Create your tests here.
+from posts.models import Post
+from .dispatcher import NotificationDispatcher, notify
+from .models import Notification
+from .views import AsyncNotificationListView
+
+User = get_user_model()
+
+
+@override_settings(SECURE_SSL_REDIRECT=False, NOTIFICATIONS_ASYNC=False)
+class NotifyTests(APITestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username='author', password='pass12345')
+        self.fan = User.objects.create_user(username='fan', password='pass12345')
+        self.post = Post.objects.create(author=self.author, title='Post', content='body')
+        self.client.force_authenticate(user=self.fan)
+
+    def test_like_comment_and_follow_notify_the_author(self):
+        self.client.post(reverse('post-like', args=[self.post.pk]))
+        self.client.post(reverse('comment-list'), {'post': self.post.pk, 'content': 'Nice'})
+        self.client.post(reverse('follow-user', args=[self.author.pk]))
+
+        verbs = set(Notification.objects.filter(recipient=self.author, actor=self.fan).values_list('verb', flat=True))
+        self.assertEqual(verbs, {'liked your post', 'commented on your post', 'started following you'})
+
+    def test_acting_on_own_content_does_not_notify(self):
+        notify(self.author, self.author, 'liked your post', target=self.post)
+        self.assertFalse(Notification.objects.exists())
+
+    @override_settings(NOTIFICATIONS_AGGREGATE_WINDOW=3600, NOTIFICATIONS_ACTOR_SAMPLE_SIZE=2)
+    def test_repeated_events_are_aggregated_into_one_row(self):
+        fans = [User.objects.create_user(username=f'fan{i}', password='x') for i in range(4)]
+        for fan in fans:
+            notify(self.author, fan, 'liked your post', target=self.post)
+        notify(self.author, fans[3], 'liked your post', target=self.post)
+
+        notification = Notification.objects.get(recipient=self.author)
+        self.assertEqual(notification.actor_id, fans[3].pk)
+        self.assertEqual(notification.actor_count, 4)
+        self.assertEqual(notification.recent_actor_ids, [fans[3].pk, fans[2].pk])
+
+    @override_settings(NOTIFICATIONS_AGGREGATE_WINDOW=3600)
+    def test_read_notifications_are_not_aggregated_into(self):
+        notify(self.author, self.fan, 'liked your post', target=self.post)
+        Notification.objects.update(read=True)
+        notify(self.author, self.fan, 'liked your post', target=self.post)
+        self.assertEqual(Notification.objects.filter(read=False).count(), 1)
+
+    @override_settings(NOTIFICATIONS_AGGREGATE_WINDOW=0)
+    def test_aggregation_can_be_disabled(self):
+        notify(self.author, self.fan, 'liked your post', target=self.post)
+        notify(self.author, self.fan, 'liked your post', target=self.post)
+        self.assertEqual(Notification.objects.count(), 2)
+
+
+@override_settings(SECURE_SSL_REDIRECT=False, NOTIFICATIONS_ASYNC=False, NOTIFICATIONS_AGGREGATE_WINDOW=0)
+class MarkReadTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='user', password='pass12345')
+        self.actor = User.objects.create_user(username='actor', password='pass12345')
+        for _ in range(4):
+            notify(self.user, self.actor, 'started following you')
+        self.ids = sorted(Notification.objects.values_list('id', flat=True))
+        self.client.force_authenticate(user=self.user)
+
+    def unread(self):
+        return self.client.get(reverse('unread-notification-count')).data['unread_count']
+
+    @override_settings(NOTIFICATIONS_UNREAD_CACHE_TIMEOUT=300)
+    def test_unread_count_is_cached_and_invalidated_on_write(self):
+        self.assertEqual(self.unread(), 4)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.unread(), 4)
+
+        notify(self.user, self.actor, 'started following you')
+        self.assertEqual(self.unread(), 5)
+
+    @override_settings(NOTIFICATIONS_UNREAD_CACHE_TIMEOUT=0)
+    def test_unread_count_is_not_cached_when_disabled(self):
+        self.assertEqual(self.unread(), 4)
+        # A write this process's cache never heard of, as from another worker.
+        Notification.objects.filter(pk=self.ids[0]).update(read=True)
+        self.assertEqual(self.unread(), 3)
+
+    def test_mark_up_to_id(self):
+        self.assertEqual(self.unread(), 4)
+        response = self.client.post(reverse('mark-notifications-read'), {'up_to': self.ids[1]}, format='json')
+        self.assertEqual(response.data, {'updated': 2, 'unread_count': 2})
+
+    def test_mark_listed_ids_and_then_all(self):
+        response = self.client.post(reverse('mark-notifications-read'), {'ids': [self.ids[3]]}, format='json')
+        self.assertEqual(response.data['updated'], 1)
+
+        response = self.client.post(reverse('mark-notifications-read'), {}, format='json')
+        self.assertEqual(response.data, {'updated': 3, 'unread_count': 0})
+
+    def test_single_mark_read_updates_count(self):
+        self.assertEqual(self.unread(), 4)
+        self.client.post(reverse('mark-notification-read', args=[self.ids[0]]))
+        self.assertEqual(self.unread(), 3)
+
+    def test_cannot_mark_other_users_notifications(self):
+        self.client.force_authenticate(user=self.actor)
+        response = self.client.post(reverse('mark-notifications-read'), {}, format='json')
+        self.assertEqual(response.data['updated'], 0)
+        response = self.client.post(reverse('mark-notification-read', args=[self.ids[0]]))
+        self.assertEqual(response.status_code, 404)
+
+
+@override_settings(SECURE_SSL_REDIRECT=False, NOTIFICATIONS_ASYNC=False, NOTIFICATIONS_AGGREGATE_WINDOW=0)
+class NotificationListQueryTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='user', password='pass12345')
+        self.client.force_authenticate(user=self.user)
+
+    def add_notifications(self, n):
+        for i in range(n):
+            actor = User.objects.create_user(username=f'actor{User.objects.count()}', password='x')
+            post = Post.objects.create(author=self.user, title=f'Post {i}', content='body')
+            notify(self.user, actor, 'liked your post', target=post)
+            notify(self.user, actor, 'started following you')
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries), response.data['results']
+
+    def test_query_count_does_not_grow_with_page(self):
+        for url in [reverse('notification-list'), reverse('notification-list') + '?expand=target']:
+            self.add_notifications(1)
+            before, _ = self.count_queries(url)
+            self.add_notifications(4)
+            after, results = self.count_queries(url)
+            self.assertEqual(before, after, url)
+
+        self.assertEqual(results[0]['target_type'], None)
+        self.assertEqual(results[1]['target_type'], 'post')
+        self.assertEqual(results[1]['target'], Post.objects.get(pk=results[1]['target_id']).title)
+
+    def test_async_view_matches_sync_view(self):
+        self.add_notifications(3)
+        for url in [reverse('notification-list') + '?page_size=4', reverse('notification-list') + '?expand=target']:
+            request = APIRequestFactory().get(url)
+            force_authenticate(request, user=self.user)
+            response = async_to_sync(AsyncNotificationListView.as_view())(request)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.data, self.client.get(url).data, url)
+
+
+@override_settings(NOTIFICATIONS_AGGREGATE_WINDOW=0)
+class NotificationDispatcherTests(TransactionTestCase):
+    def test_queued_notifications_are_written_in_batches(self):
+        author = User.objects.create_user(username='author', password='x')
+        fans = [User.objects.create_user(username=f'fan{i}', password='x') for i in range(5)]
+        dispatcher = NotificationDispatcher(batch_size=2, flush_interval=0.05)
+        writes = []
+        write = dispatcher.write
+        dispatcher.write = lambda batch: (writes.append(len(batch)), write(batch))
+
+        for fan in fans:
+            dispatcher.enqueue(Notification(recipient=author, actor=fan, verb='liked your post'))
+        self.assertTrue(dispatcher.flush(timeout=5))
+
+        self.assertEqual(Notification.objects.filter(recipient=author).count(), 5)
+        self.assertEqual(sum(writes), 5)
+        self.assertTrue(all(size <= 2 for size in writes))
@@ -0,0 +1,39 @@
+"""Cached unread-notification counts for badge polling.
+
+The count is cached per user for ``NOTIFICATIONS_UNREAD_CACHE_TIMEOUT``
+seconds (``0`` disables caching) and deleted whenever that user's
+notifications are written or marked read, so polling is normally a cache
+hit. Counts are taken on the primary database: a count read from a lagging replica would stay
+cached until the user's next notification.
+"""
+from django.conf import settings
+from django.core.cache import cache
+
+from social_media_api.replicas import use_primary
+
+from .models import Notification
+
+
+def _cache_key(user_id):
+    return f'notifications:unread:{user_id}'
+
+
+def _count(user):
+    with use_primary():
+        return Notification.objects.filter(recipient=user, read=False).count()
+
+
+def unread_count(user):
+    timeout = getattr(settings, 'NOTIFICATIONS_UNREAD_CACHE_TIMEOUT', 0)
+    if not timeout:
+        return _count(user)
+    key = _cache_key(user.pk)
+    count = cache.get(key)
+    if count is None:
+        count = _count(user)
+        cache.set(key, count, timeout)
+    return count
+
+
+def invalidate_unread_count(*user_ids):
+    cache.delete_many([_cache_key(user_id) for user_id in user_ids])
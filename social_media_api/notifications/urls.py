@@ -1,7 +1,18 @@
+from django.conf import settings
 from django.urls import path
-from .views import NotificationListView, mark_notification_read
+from .views import (
+    AsyncNotificationListView, NotificationListView, mark_notification_read, mark_notifications_read,
+    unread_notification_count,
+)
+
+if getattr(settings, 'ASYNC_VIEWS', False):
+    notification_list_view = AsyncNotificationListView.as_view()
+else:
+    notification_list_view = NotificationListView.as_view()
 
 urlpatterns = [
-    path('notifications/', NotificationListView.as_view(), name='notification-list'),
+    path('notifications/', notification_list_view, name='notification-list'),
+    path('notifications/read/', mark_notifications_read, name='mark-notifications-read'),
+    path('notifications/unread-count/', unread_notification_count, name='unread-notification-count'),
     path('notifications/<int:notification_id>/read/', mark_notification_read, name='mark-notification-read'),
 ]
@@ -1,27 +1,85 @@
+from asgiref.sync import sync_to_async
 from rest_framework import generics, permissions
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from .models import Notification
-from .serializers import NotificationSerializer
+from .serializers import MarkReadSerializer, NotificationSerializer
+from .unread import invalidate_unread_count, unread_count
+from social_media_api.asyncviews import AsyncListAPIView
+from social_media_api.pagination import KeysetPagination
+
+
+class NotificationPagination(KeysetPagination):
+    ordering = ('-timestamp', '-id')
 
 
 class NotificationListView(generics.ListAPIView):
-    """List all notifications for the authenticated user"""
+    """List all notifications for the authenticated user.
+
+    Pass ``?expand=target`` to include each target's text, fetched with one
+    query per content type on the page.
+    """
     serializer_class = NotificationSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = NotificationPagination
+
+    def expand_target(self):
+        return self.request.query_params.get('expand') == 'target'
 
     def get_queryset(self):
-        return Notification.objects.filter(recipient=self.request.user)
+        queryset = (
+            Notification.objects.filter(recipient=self.request.user)
+            .select_related('actor', 'target_content_type')
+        )
+        if self.expand_target():
+            queryset = queryset.prefetch_related('target')
+        return queryset
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['expand_target'] = self.expand_target()
+        return context
+
+
+class AsyncNotificationListView(AsyncListAPIView, NotificationListView):
+    """``NotificationListView`` for the ASGI serving mode (see social_media_api/asyncviews.py)."""
+
+    async def serialize(self, serializer):
+        if self.expand_target():
+            # A target's __str__ may follow its own relations.
+            return await sync_to_async(lambda: serializer.data)()
+        return serializer.data
 
 
 @api_view(['POST'])
 @permission_classes([permissions.IsAuthenticated])
 def mark_notification_read(request, notification_id):
     """Mark a notification as read"""
-    try:
-        notification = Notification.objects.get(id=notification_id, recipient=request.user)
-        notification.read = True
-        notification.save()
-        return Response({'message': 'Notification marked as read'})
-    except Notification.DoesNotExist:
+    if not Notification.objects.filter(id=notification_id, recipient=request.user).update(read=True):
         return Response({'error': 'Notification not found'}, status=404)
+    invalidate_unread_count(request.user.pk)
+    return Response({'message': 'Notification marked as read'})
+
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def mark_notifications_read(request):
+    """Mark many notifications as read with a single UPDATE"""
+    serializer = MarkReadSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    notifications = Notification.objects.filter(recipient=request.user, read=False)
+    if 'ids' in serializer.validated_data:
+        notifications = notifications.filter(id__in=serializer.validated_data['ids'])
+    if 'up_to' in serializer.validated_data:
+        notifications = notifications.filter(id__lte=serializer.validated_data['up_to'])
+    updated = notifications.update(read=True)
+    if updated:
+        invalidate_unread_count(request.user.pk)
+    return Response({'updated': updated, 'unread_count': unread_count(request.user)})
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def unread_notification_count(request):
+    """Number of unread notifications, served from cache"""
+    return Response({'unread_count': unread_count(request.user)})
@@ -0,0 +1,145 @@
+"""Home timeline storage for ``PostViewSet.feed``.
+
+New posts are fanned out on write: one ``FeedEntry`` row per follower, so a
+feed page is a single indexed range scan over the reader's own entries.
+Posts by authors with more than ``FEED_FANOUT_THRESHOLD`` followers are
+skipped at write time, marked ``fanned_out=False``, and merged in when the
+feed is read instead (fan-out on read), which keeps a single post from
+turning into millions of inserts. The flag stays on the post, so it is still
+merged in after its author drops back below the threshold.
+"""
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.models import Q
+
+from .models import FeedEntry, Post
+from accounts import graph
+from social_media_api.pagination import KeysetPagination
+
+User = get_user_model()
+Follow = User.following.through
+
+CELEBRITY_CACHE_KEY = 'feed:celebrity-ids'
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def get_celebrity_ids():
+    """Return the IDs of authors with posts that are merged in at read time."""
+    ids = cache.get(CELEBRITY_CACHE_KEY)
+    if ids is None:
+        ids = set(
+            Post.objects.filter(fanned_out=False).order_by()
+            .values_list('author_id', flat=True).distinct()
+        )
+        cache.set(CELEBRITY_CACHE_KEY, ids, _setting('FEED_CELEBRITY_CACHE_TIMEOUT', 300))
+    return ids
+
+
+def fan_out_post(post):
+    """Copy ``post`` into the timeline of every follower of its author.
+
+    Returns the number of follower timelines written, or 0 when the author is
+    above the fan-out threshold and the post will be read on demand instead.
+    """
+    follower_count = User.objects.values_list('followers_count', flat=True).get(pk=post.author_id)
+    if follower_count > _setting('FEED_FANOUT_THRESHOLD', 10000):
+        Post.objects.filter(pk=post.pk).update(fanned_out=False)
+        post.fanned_out = False
+        # The author may have just crossed the threshold; make sure readers
+        # pick up this post through the fan-out-on-read path right away.
+        cache.delete(CELEBRITY_CACHE_KEY)
+        return 0
+
+    followers = Follow.objects.filter(to_user_id=post.author_id)
+    batch_size = _setting('FEED_FANOUT_BATCH_SIZE', 1000)
+    written = 0
+    batch = []
+    for follower_id in followers.values_list('from_user_id', flat=True).iterator(chunk_size=batch_size):
+        batch.append(FeedEntry(
+            owner_id=follower_id,
+            post_id=post.pk,
+            author_id=post.author_id,
+            created_at=post.created_at,
+        ))
+        if len(batch) >= batch_size:
+            FeedEntry.objects.bulk_create(batch, ignore_conflicts=True)
+            written += len(batch)
+            batch = []
+    if batch:
+        FeedEntry.objects.bulk_create(batch, ignore_conflicts=True)
+        written += len(batch)
+    return written
+
+
+def backfill(owner_id, author_ids):
+    """Seed ``owner``'s timeline with recent posts from newly followed authors."""
+    limit = _setting('FEED_BACKFILL_LIMIT', 200)
+    entries = []
+    for author_id in author_ids:
+        posts = (
+            Post.objects.filter(author_id=author_id)
+            .order_by('-created_at')
+            .values_list('id', 'created_at')[:limit]
+        )
+        entries.extend(
+            FeedEntry(owner_id=owner_id, post_id=post_id, author_id=author_id, created_at=created_at)
+            for post_id, created_at in posts
+        )
+    FeedEntry.objects.bulk_create(entries, ignore_conflicts=True)
+
+
+def remove_authors(owner_id, author_ids):
+    """Drop posts by unfollowed authors from ``owner``'s timeline."""
+    FeedEntry.objects.filter(owner_id=owner_id, author_id__in=author_ids).delete()
+
+
+def feed_queryset(user):
+    """Return ``user``'s home timeline, unordered, for ``FeedPagination``.
+
+    When no followed author has posts that skipped fan-out this is a
+    ``FeedEntry`` queryset, paged straight off the owner's timeline index.
+    Otherwise it is a ``Post`` queryset with those authors' ``fanned_out=False``
+    posts OR-ed in.
+    """
+    celebrity_ids = get_celebrity_ids()
+    followed_celebrities = []
+    if celebrity_ids:
+        followed = graph.following_map(user.pk, celebrity_ids)
+        followed_celebrities = sorted(pk for pk, follows in followed.items() if follows)
+
+    if not followed_celebrities:
+        return FeedEntry.objects.filter(owner=user).select_related('post__author')
+
+    entries = FeedEntry.objects.filter(owner=user).values('post_id')
+    return Post.objects.filter(
+        Q(pk__in=entries) | Q(author_id__in=followed_celebrities, fanned_out=False)
+    ).select_related('author')
+
+
+class FeedPagination(KeysetPagination):
+    """Keyset pagination over either shape returned by ``feed_queryset``.
+
+    A ``FeedEntry`` copies its post's ``created_at`` and ``post_id``, so
+    ``(created_at, post_id)`` on entries and ``(created_at, id)`` on posts hold
+    the same values and cursors work across both shapes.
+    """
+
+    def get_page_queryset(self, queryset, request):
+        if queryset.model is FeedEntry:
+            self.ordering = ('-created_at', '-post_id')
+        return super().get_page_queryset(queryset, request)
+
+    def set_page(self, results):
+        page = super().set_page(results)
+        if page and isinstance(page[0], FeedEntry):
+            self.page = [entry.post for entry in page]
+        return self.page
+
+    def get_cursor_for(self, obj):
+        # The page always holds posts by now, whichever shape was queried.
+        self.ordering = ('-created_at', '-id')
+        return super().get_cursor_for(obj)
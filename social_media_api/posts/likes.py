@@ -0,0 +1,81 @@
+"""Race-free like/unlike for ``PostViewSet.like`` / ``unlike``.
+
+Each operation is one conditional write plus the counter update, issued as
+raw SQL inside one transaction:
+
+* like: ``INSERT ... SELECT ... ON CONFLICT DO NOTHING RETURNING`` inserts
+  the ``Like`` only if the post exists and it is not already liked;
+* unlike: ``DELETE ... RETURNING`` removes it only if present.
+
+Only the request whose write actually changed a row touches
+``likes_count``, so concurrent double-taps can neither duplicate a like nor
+double-count it. The ``UPDATE ... RETURNING`` (or plain ``SELECT`` when
+nothing changed) hands back the new count and the author, so the view needs
+no further queries. Requires a backend with ``RETURNING`` (PostgreSQL, or
+SQLite 3.35+).
+
+These writes bypass model signals, so callers invalidate anything that
+listens to ``Like`` saves (see ``PostViewSet.like``).
+"""
+from collections import namedtuple
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import Like, Post
+
+LikeState = namedtuple('LikeState', ['changed', 'liked', 'likes_count', 'author_id'])
+
+
+def _tables():
+    return connection.ops.quote_name(Like._meta.db_table), connection.ops.quote_name(Post._meta.db_table)
+
+
+def _current(cursor, post_id, liked):
+    _, posts = _tables()
+    cursor.execute(f'SELECT likes_count, author_id FROM {posts} WHERE id = %s', [post_id])
+    row = cursor.fetchone()
+    return None if row is None else LikeState(False, liked, *row)
+
+
+def like_post(user_id, post_id):
+    """Like ``post_id`` as ``user_id``; return a ``LikeState`` or None if no such post."""
+    likes, posts = _tables()
+    created_at = connection.ops.adapt_datetimefield_value(timezone.now())
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {likes} (user_id, post_id, created_at) '
+            f'SELECT %s, id, %s FROM {posts} WHERE id = %s '
+            f'ON CONFLICT (user_id, post_id) DO NOTHING RETURNING post_id',
+            [user_id, created_at, post_id],
+        )
+        if cursor.fetchone() is None:
+            return _current(cursor, post_id, liked=True)
+        cursor.execute(
+            f'UPDATE {posts} SET likes_count = likes_count + 1 WHERE id = %s RETURNING likes_count, author_id',
+            [post_id],
+        )
+        return LikeState(True, True, *cursor.fetchone())
+
+
+def unlike_post(user_id, post_id):
+    """Remove ``user_id``'s like of ``post_id``; return a ``LikeState`` or None if no such post."""
+    likes, posts = _tables()
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {likes} WHERE user_id = %s AND post_id = %s RETURNING post_id',
+            [user_id, post_id],
+        )
+        if cursor.fetchone() is None:
+            return _current(cursor, post_id, liked=False)
+        # The guard keeps a drifted counter from going below zero.
+        cursor.execute(
+            f'UPDATE {posts} SET likes_count = likes_count - 1 '
+            f'WHERE id = %s AND likes_count > 0 RETURNING likes_count, author_id',
+            [post_id],
+        )
+        row = cursor.fetchone()
+        if row is None:
+            state = _current(cursor, post_id, liked=False)
+            return state._replace(changed=True)
+        return LikeState(True, False, *row)
@@ -0,0 +1,168 @@
+import contextlib
+import statistics
+import time
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from notifications.models import Notification
+from posts.models import Comment, FeedEntry, Post
+
+User = get_user_model()
+
+BENCH_PREFIX = 'bench_'
+
+# Composite indexes whose effect is measured with --compare.
+BENCHMARKED_INDEXES = {
+    FeedEntry: ['feedentry_owner_recent_idx'],
+    Post: ['post_created_idx', 'post_author_created_idx'],
+    Comment: ['comment_created_idx', 'comment_post_created_idx'],
+    Notification: ['notification_recipient_ts_idx', 'notification_unread_idx'],
+}
+
+
+@contextlib.contextmanager
+def explicit_timestamps(*fields):
+    """Let bulk_create keep the timestamps we assign to auto_now_add fields."""
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+class Command(BaseCommand):
+    help = (
+        'Seed synthetic posts/comments/notifications and report query plans and latency '
+        'for the feed, comment and notification query shapes. Run it against a throwaway '
+        'database (e.g. DATABASE_URL=sqlite:////tmp/bench.sqlite3).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', action='store_true', help='Insert synthetic rows before measuring.')
+        parser.add_argument('--rows', type=int, default=1_000_000, help='Total rows to seed (default 1,000,000).')
+        parser.add_argument('--users', type=int, default=2000)
+        parser.add_argument('--follows', type=int, default=500, help='Accounts followed by the benchmark reader.')
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--compare', action='store_true',
+                            help='Also measure with the composite indexes dropped (restored afterwards).')
+        parser.add_argument('--cleanup', action='store_true', help='Delete all seeded rows and exit.')
+
+    def handle(self, *args, **options):
+        if options['cleanup']:
+            deleted, _ = User.objects.filter(username__startswith=BENCH_PREFIX).delete()
+            self.stdout.write(f'Deleted {deleted} seeded row(s).')
+            return
+        if options['seed']:
+            self.seed(options['rows'], options['users'], options['follows'])
+
+        reader = User.objects.filter(username=f'{BENCH_PREFIX}reader').first()
+        if reader is None:
+            raise CommandError('No benchmark data found; run with --seed first.')
+
+        if options['compare']:
+            with self.indexes_dropped():
+                self.stdout.write(self.style.MIGRATE_HEADING('Without composite indexes'))
+                self.measure(reader, options['repeat'])
+        self.stdout.write(self.style.MIGRATE_HEADING('With composite indexes'))
+        self.measure(reader, options['repeat'])
+
+    def seed(self, rows, user_count, follows):
+        now = timezone.now()
+        post_count, comment_count = rows // 5, rows * 2 // 5
+        notification_count = rows - post_count - comment_count
+        self.stdout.write(f'Seeding {user_count} users, {post_count} posts, '
+                          f'{comment_count} comments and {notification_count} notifications...')
+
+        users = [User(username=f'{BENCH_PREFIX}{i}', password='!') for i in range(user_count)]
+        users.append(User(username=f'{BENCH_PREFIX}reader', password='!'))
+        User.objects.bulk_create(users, batch_size=5000)
+        user_ids = list(User.objects.filter(username__startswith=BENCH_PREFIX).values_list('pk', flat=True))
+        reader = User.objects.get(username=f'{BENCH_PREFIX}reader')
+        reader.following.add(*user_ids[:follows])
+
+        def at(i):
+            return now - timedelta(seconds=i)
+
+        with explicit_timestamps(Post._meta.get_field('created_at')):
+            self.bulk(Post, (
+                Post(author_id=user_ids[i % user_count], title=f'Post {i}', content='x', created_at=at(i))
+                for i in range(post_count)
+            ))
+        post_ids = list(Post.objects.filter(author__username__startswith=BENCH_PREFIX).values_list('pk', flat=True))
+        self.bulk(FeedEntry, (
+            FeedEntry(owner=reader, post_id=post_id, author_id=author_id, created_at=created_at)
+            for post_id, author_id, created_at in Post.objects.filter(author_id__in=user_ids[:follows])
+            .values_list('pk', 'author_id', 'created_at').iterator()
+        ))
+
+        # Skew comments towards a few hot posts, like a viral thread.
+        with explicit_timestamps(Comment._meta.get_field('created_at')):
+            self.bulk(Comment, (
+                Comment(post_id=post_ids[(i * i) % min(len(post_ids), 1000)], author_id=user_ids[i % user_count],
+                        content='x', created_at=at(i))
+                for i in range(comment_count)
+            ))
+        with explicit_timestamps(Notification._meta.get_field('timestamp')):
+            self.bulk(Notification, (
+                Notification(recipient_id=reader.pk if i % 10 == 0 else user_ids[i % user_count],
+                             actor_id=user_ids[(i + 1) % user_count], verb='liked your post',
+                             read=i % 3 == 0, timestamp=at(i))
+                for i in range(notification_count)
+            ))
+
+    def bulk(self, model, objects, batch_size=10000):
+        batch = []
+        for obj in objects:
+            batch.append(obj)
+            if len(batch) >= batch_size:
+                model.objects.bulk_create(batch)
+                batch = []
+        model.objects.bulk_create(batch)
+
+    @contextlib.contextmanager
+    def indexes_dropped(self):
+        dropped = []
+        try:
+            with connection.schema_editor() as editor:
+                for model, names in BENCHMARKED_INDEXES.items():
+                    for index in model._meta.indexes:
+                        if index.name in names:
+                            editor.remove_index(model, index)
+                            dropped.append((model, index))
+            yield
+        finally:
+            with connection.schema_editor() as editor:
+                for model, index in dropped:
+                    editor.add_index(model, index)
+
+    def measure(self, reader, repeat):
+        hot_post = Comment.objects.values_list('post_id', flat=True).first()
+        followed = reader.following.values_list('pk', flat=True)
+        shapes = {
+            'feed (author IN followed, newest first)':
+                Post.objects.filter(author__in=followed).order_by('-created_at', '-id')[:10],
+            'feed (precomputed timeline, newest first)':
+                FeedEntry.objects.filter(owner=reader).order_by('-created_at', '-post_id')[:10],
+            'comments of one post, newest first':
+                Comment.objects.filter(post_id=hot_post).order_by('-created_at', '-id')[:10],
+            'notifications of one user, newest first':
+                Notification.objects.filter(recipient=reader).order_by('-timestamp', '-id')[:10],
+            'unread notifications of one user':
+                Notification.objects.filter(recipient=reader, read=False).order_by('-timestamp')[:10],
+        }
+        for label, queryset in shapes.items():
+            timings = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                list(queryset.all())
+                timings.append((time.perf_counter() - start) * 1000)
+            self.stdout.write(self.style.SUCCESS(
+                f'{label}: median {statistics.median(timings):.2f} ms, max {max(timings):.2f} ms'
+            ))
+            self.stdout.write(queryset.explain())
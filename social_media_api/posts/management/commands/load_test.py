@@ -0,0 +1,114 @@
+import http.client
+import statistics
+import threading
+import time
+from urllib.parse import urlsplit
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.authtoken.models import Token
+
+User = get_user_model()
+
+DEFAULT_PATHS = ['/api/feed/', '/api/notifications/', '/api/accounts/profile/']
+
+
+class Command(BaseCommand):
+    help = (
+        'Load-test a running server: keep N clients busy on the feed, notification list and '
+        'profile endpoints and report throughput and latency per concurrency level. Start the '
+        'server with a single worker (gunicorn --workers 1) in each SERVER_MODE to compare the '
+        'concurrent request capacity of one sync worker against one uvicorn worker.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('base_url', help='e.g. http://127.0.0.1:8000')
+        parser.add_argument('--token', help='API token to send.')
+        parser.add_argument('--username', help='Send the token of this user, created if missing, from '
+                                               'the database configured here (it must be the server\'s).')
+        parser.add_argument('--path', action='append', dest='paths',
+                            help=f'Path to request, repeatable (default: {", ".join(DEFAULT_PATHS)}).')
+        parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 8, 32, 64],
+                            help='Concurrent clients, one run per value.')
+        parser.add_argument('--duration', type=float, default=10.0, help='Seconds per run.')
+        parser.add_argument('--workers', type=int, default=1,
+                            help='Server worker count, to report throughput per worker.')
+
+    def handle(self, *args, **options):
+        url = urlsplit(options['base_url'])
+        if url.scheme not in ('http', 'https') or not url.netloc:
+            raise CommandError('base_url must look like http://host:port')
+        token = options['token']
+        if options['username']:
+            user = User.objects.filter(username=options['username']).first()
+            if user is None:
+                raise CommandError(f'No user named {options["username"]!r}.')
+            token = Token.objects.get_or_create(user=user)[0].key
+        if not token:
+            raise CommandError('Pass --token or --username.')
+
+        paths = options['paths'] or DEFAULT_PATHS
+        headers = {'Authorization': f'Token {token}', 'Accept': 'application/json'}
+        self.stdout.write(f'{url.geturl()}: {", ".join(paths)}')
+        for clients in options['concurrency']:
+            latencies, errors, elapsed = self.run(url, paths, headers, clients, options['duration'])
+            self.report(clients, latencies, errors, elapsed, options['workers'])
+
+    def run(self, url, paths, headers, clients, duration):
+        latencies = []
+        errors = []
+        deadline = time.perf_counter() + duration
+        lock = threading.Lock()
+
+        def client(offset):
+            connection_class = http.client.HTTPSConnection if url.scheme == 'https' else http.client.HTTPConnection
+            connection = connection_class(url.netloc, timeout=60)
+            done = []
+            failed = []
+            request_number = offset
+            while time.perf_counter() < deadline:
+                path = paths[request_number % len(paths)]
+                request_number += 1
+                start = time.perf_counter()
+                try:
+                    # Reconnects by itself when the server closed the connection.
+                    connection.request('GET', path, headers=headers)
+                    response = connection.getresponse()
+                    response.read()
+                except (OSError, http.client.HTTPException) as exc:
+                    connection.close()
+                    failed.append(type(exc).__name__)
+                    continue
+                if response.status != 200:
+                    failed.append(str(response.status))
+                    continue
+                done.append(time.perf_counter() - start)
+            connection.close()
+            with lock:
+                latencies.extend(done)
+                errors.extend(failed)
+
+        started = time.perf_counter()
+        threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return latencies, errors, time.perf_counter() - started
+
+    def report(self, clients, latencies, errors, elapsed, workers):
+        if not latencies:
+            self.stdout.write(self.style.ERROR(f'{clients:>4} clients: no successful requests ({len(errors)} errors)'))
+            return
+        throughput = len(latencies) / elapsed
+        quantiles = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99
+        line = (
+            f'{clients:>4} clients: {throughput:8.1f} req/s ({throughput / workers:.1f} per worker), '
+            f'p50 {quantiles[49] * 1000:.1f} ms, p95 {quantiles[94] * 1000:.1f} ms, '
+            f'p99 {quantiles[98] * 1000:.1f} ms'
+        )
+        if errors:
+            kinds = ', '.join(f'{kind} x{errors.count(kind)}' for kind in sorted(set(errors)))
+            self.stdout.write(self.style.WARNING(f'{line}, {len(errors)} errors ({kinds})'))
+        else:
+            self.stdout.write(self.style.SUCCESS(line))
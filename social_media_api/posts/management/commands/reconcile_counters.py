@@ -0,0 +1,67 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Max, Min, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from posts.models import Comment, Like, Post
+
+User = get_user_model()
+Follow = User.following.through
+
+
+def _count(model, field):
+    """Correlated ``COUNT(*)`` of ``model`` rows whose ``field`` is the outer pk."""
+    rows = model.objects.filter(**{field: OuterRef('pk')}).order_by().values(field)
+    return Coalesce(Subquery(rows.annotate(n=Count('*')).values('n')), 0)
+
+
+class Command(BaseCommand):
+    help = 'Recompute denormalized like/comment/follow counters and fix any that drifted.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        fixed_posts = self.reconcile(Post, {
+            'likes_count': _count(Like, 'post'),
+            'comments_count': _count(Comment, 'post'),
+        }, batch_size)
+        fixed_users = self.reconcile(User, {
+            'followers_count': _count(Follow, 'to_user'),
+            'following_count': _count(Follow, 'from_user'),
+        }, batch_size)
+        self.stdout.write(self.style.SUCCESS(
+            f'Fixed counters on {fixed_posts} post(s) and {fixed_users} user(s).'
+        ))
+
+    def reconcile(self, model, expressions, batch_size):
+        """Walk ``model`` in primary-key ranges and bulk-update drifted rows."""
+        fields = list(expressions)
+        annotations = {f'actual_{field}': expr for field, expr in expressions.items()}
+        bounds = model.objects.aggregate(first=Min('pk'), last=Max('pk'))
+        if bounds['first'] is None:
+            return 0
+        fixed = 0
+        for start in range(bounds['first'], bounds['last'] + 1, batch_size):
+            with transaction.atomic():
+                rows = (
+                    model.objects.filter(pk__gte=start, pk__lt=start + batch_size)
+                    .annotate(**annotations)
+                    .only('pk', *fields)
+                )
+                drifted = []
+                for obj in rows:
+                    changed = False
+                    for field in fields:
+                        actual = getattr(obj, f'actual_{field}')
+                        if getattr(obj, field) != actual:
+                            setattr(obj, field, actual)
+                            changed = True
+                    if changed:
+                        drifted.append(obj)
+                if drifted:
+                    model.objects.bulk_update(drifted, fields)
+                fixed += len(drifted)
+        return fixed
@@ -0,0 +1,34 @@
+# Generated by Django 4.2.7 on 2026-10-17 09:05
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def mark_unfanned_posts(apps, schema_editor):
+    """Flag posts by authors above the threshold; fan-out skipped them."""
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    Post = apps.get_model('posts', 'Post')
+    threshold = getattr(settings, 'FEED_FANOUT_THRESHOLD', 10000)
+    celebrities = User.objects.filter(followers_count__gt=threshold).values('pk')
+    Post.objects.filter(author_id__in=celebrities).update(fanned_out=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0004_user_follow_counts'),
+        ('posts', '0005_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='fanned_out',
+            field=models.BooleanField(default=True),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(condition=models.Q(('fanned_out', False)), fields=['author', '-created_at', '-id'], name='post_unfanned_idx'),
+        ),
+        migrations.RunPython(mark_unfanned_posts, migrations.RunPython.noop),
+    ]
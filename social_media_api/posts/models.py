@@ -10,9 +10,25 @@ class Post(models.Model):
     content = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Denormalized counts, updated with F() expressions alongside the
+    # Like/Comment writes; `manage.py reconcile_counters` repairs any drift.
+    likes_count = models.PositiveIntegerField(default=0)
+    comments_count = models.PositiveIntegerField(default=0)
+    # False when the author was above FEED_FANOUT_THRESHOLD at write time, so
+    # the post has no FeedEntry rows and feeds merge it in on read.
+    fanned_out = models.BooleanField(default=True)
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Post list, and per-author listing / fan-out-on-read feeds.
+            models.Index(fields=['-created_at', '-id'], name='post_created_idx'),
+            models.Index(fields=['author', '-created_at', '-id'], name='post_author_created_idx'),
+            models.Index(
+                fields=['author', '-created_at', '-id'], name='post_unfanned_idx',
+                condition=models.Q(fanned_out=False),
+            ),
+        ]
 
     def __str__(self):
         return self.title
@@ -27,6 +43,11 @@ class Comment(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Keyset pages of all comments, and of one post's comments.
+            models.Index(fields=['-created_at', '-id'], name='comment_created_idx'),
+            models.Index(fields=['post', '-created_at', '-id'], name='comment_post_created_idx'),
+        ]
 
     def __str__(self):
         return f'Comment by {self.author.username} on {self.post.title}'
@@ -43,3 +64,28 @@ class Like(models.Model):
 
     def __str__(self):
         return f'{self.user.username} likes {self.post.title}'
+
+
+class FeedEntry(models.Model):
+    """Materialized home-timeline row: ``post`` shows up in ``owner``'s feed.
+
+    Rows are written when a post is created (fan-out on write), so reading a
+    feed page is a range scan over the ``(owner, -created_at, -post)`` index.
+    ``author`` and ``created_at`` are copied from the post so that unfollows
+    and ordering never need to join back to ``Post``.
+    """
+    owner = models.ForeignKey(User, on_delete=models.CASCADE, related_name='feed_entries')
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='feed_entries')
+    author = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    created_at = models.DateTimeField()
+
+    class Meta:
+        unique_together = ('owner', 'post')
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['owner', '-created_at', '-post'], name='feedentry_owner_recent_idx'),
+            models.Index(fields=['owner', 'author'], name='feedentry_owner_author_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.post.title} in {self.owner.username}\'s feed'
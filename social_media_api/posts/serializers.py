@@ -1,18 +1,75 @@
 from rest_framework import serializers
+from rest_framework.reverse import reverse
+from rest_framework.utils.urls import replace_query_param
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from .models import Post, Comment
+from django.db import models
+from .models import Post, Comment, Like
+from social_media_api.pagination import KeysetPagination
 
 User = get_user_model()
 
 
+def _liked_post_ids(request):
+    """Per-request ``{post_id: bool}`` map of what ``request.user`` has liked."""
+    liked = getattr(request, '_liked_post_ids', None)
+    if liked is None:
+        liked = request._liked_post_ids = {}
+    return liked
+
+
+async def aload_liked_post_ids(request, posts):
+    """Fill the ``liked_by_me`` map for ``posts`` with the async ORM.
+
+    Async views call this before serializing so that rendering issues no
+    queries.
+    """
+    liked = _liked_post_ids(request)
+    missing = [post.pk for post in posts if post.pk not in liked]
+    if missing and request.user.is_authenticated:
+        likes = Like.objects.filter(user=request.user, post_id__in=missing).values_list('post_id', flat=True)
+        found = {pk async for pk in likes}
+        liked.update((pk, pk in found) for pk in missing)
+
+
+class PostListSerializer(serializers.ListSerializer):
+    """Resolve ``liked_by_me`` for a whole page of posts with one query."""
+
+    def to_representation(self, data):
+        posts = list(data.all() if isinstance(data, models.Manager) else data)
+        request = self.context.get('request')
+        if request and request.user.is_authenticated:
+            liked = _liked_post_ids(request)
+            missing = [post.pk for post in posts if post.pk not in liked]
+            if missing:
+                found = set(
+                    Like.objects.filter(user=request.user, post_id__in=missing).values_list('post_id', flat=True)
+                )
+                liked.update((pk, pk in found) for pk in missing)
+        return super().to_representation(posts)
+
+
 class PostSerializer(serializers.ModelSerializer):
     author = serializers.StringRelatedField(read_only=True)
     author_id = serializers.ReadOnlyField(source='author.id')
+    likes_count = serializers.IntegerField(read_only=True)
+    liked_by_me = serializers.SerializerMethodField()
     
     class Meta:
         model = Post
-        fields = ['id', 'author', 'author_id', 'title', 'content', 'created_at', 'updated_at']
+        fields = ['id', 'author', 'author_id', 'title', 'content', 'created_at', 'updated_at',
+                  'likes_count', 'liked_by_me']
         read_only_fields = ['id', 'author', 'author_id', 'created_at', 'updated_at']
+        list_serializer_class = PostListSerializer
+
+    def get_liked_by_me(self, obj):
+        request = self.context.get('request')
+        if not (request and request.user.is_authenticated):
+            return False
+        liked = _liked_post_ids(request)
+        if obj.pk not in liked:
+            liked[obj.pk] = Like.objects.filter(user=request.user, post_id=obj.pk).exists()
+        return liked[obj.pk]
 
     def create(self, validated_data):
         validated_data['author'] = self.context['request'].user
@@ -34,11 +91,42 @@ class CommentSerializer(serializers.ModelSerializer):
 
 
 class PostDetailSerializer(PostSerializer):
-    comments = CommentSerializer(many=True, read_only=True)
-    comments_count = serializers.SerializerMethodField()
+    """Post with only its newest comments embedded.
+
+    The remaining comments are paged through ``comments_next``, a cursor link
+    into ``PostViewSet.comments``, so the response size stays flat however
+    many comments a post collects. Expects ``recent_comments`` to be
+    prefetched with ``recent_comments_limit() + 1`` rows.
+    """
+    comments = serializers.SerializerMethodField()
+    comments_count = serializers.IntegerField(read_only=True)
+    comments_next = serializers.SerializerMethodField()
     
     class Meta(PostSerializer.Meta):
-        fields = PostSerializer.Meta.fields + ['comments', 'comments_count']
+        fields = PostSerializer.Meta.fields + ['comments', 'comments_count', 'comments_next']
+
+    @staticmethod
+    def recent_comments_limit():
+        return getattr(settings, 'POST_DETAIL_COMMENTS_LIMIT', 10)
+
+    def _recent_comments(self, obj):
+        comments = getattr(obj, 'recent_comments', None)
+        if comments is None:
+            limit = self.recent_comments_limit()
+            comments = obj.recent_comments = list(
+                obj.comments.select_related('author').order_by('-created_at', '-id')[:limit + 1]
+            )
+        return comments
     
-    def get_comments_count(self, obj):
-        return obj.comments.count()
+    def get_comments(self, obj):
+        comments = self._recent_comments(obj)[:self.recent_comments_limit()]
+        return CommentSerializer(comments, many=True, context=self.context).data
+
+    def get_comments_next(self, obj):
+        comments = self._recent_comments(obj)
+        limit = self.recent_comments_limit()
+        if len(comments) <= limit:
+            return None
+        url = reverse('post-comments', args=[obj.pk], request=self.context.get('request'))
+        cursor = KeysetPagination().get_cursor_for(comments[limit - 1])
+        return replace_query_param(url, KeysetPagination.cursor_query_param, cursor)
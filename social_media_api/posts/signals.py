@@ -0,0 +1,53 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from . import feed
+from .models import Comment, FeedEntry, Like, Post
+from social_media_api.cache import invalidate, object_namespace
+
+User = get_user_model()
+
+
+@receiver(m2m_changed, sender=User.following.through)
+def sync_feed_with_follows(sender, instance, action, reverse, pk_set, **kwargs):
+    """Keep materialized timelines in step with follow/unfollow."""
+    if action == 'post_add':
+        if reverse:
+            # author.followers.add(*users)
+            for follower_id in pk_set:
+                feed.backfill(follower_id, [instance.pk])
+        else:
+            feed.backfill(instance.pk, pk_set)
+    elif action == 'post_remove':
+        if reverse:
+            for follower_id in pk_set:
+                feed.remove_authors(follower_id, [instance.pk])
+        else:
+            feed.remove_authors(instance.pk, pk_set)
+    elif action == 'post_clear':
+        if reverse:
+            FeedEntry.objects.filter(author=instance).delete()
+        else:
+            FeedEntry.objects.filter(owner=instance).delete()
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_post_responses(sender, instance, **kwargs):
+    """A post's fields appear in the post lists and its own detail."""
+    invalidate('posts', object_namespace('posts', instance.pk))
+
+
+@receiver(post_save, sender=Like)
+@receiver(post_delete, sender=Like)
+def invalidate_liked_post_responses(sender, instance, **kwargs):
+    """``likes_count`` and ``liked_by_me`` appear in the lists and the post's detail."""
+    invalidate('posts', object_namespace('posts', instance.post_id))
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_commented_post_response(sender, instance, **kwargs):
+    """Comments and ``comments_count`` only appear in the post's detail."""
+    invalidate(object_namespace('posts', instance.post_id))
@@ -0,0 +1,514 @@
+from io import StringIO
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIRequestFactory, APITestCase, force_authenticate
+
+from .likes import like_post, unlike_post
+from .models import Comment, FeedEntry, Like, Post
+from .views import AsyncFeedView
+
+User = get_user_model()
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class FeedTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.reader = User.objects.create_user(username='reader', password='pass12345')
+        self.author = User.objects.create_user(username='author', password='pass12345')
+        self.stranger = User.objects.create_user(username='stranger', password='pass12345')
+
+    def create_post(self, user, title):
+        self.client.force_authenticate(user=user)
+        response = self.client.post(reverse('post-list'), {'title': title, 'content': 'body'})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return response.data['id']
+
+    def get_feed_ids(self):
+        self.client.force_authenticate(user=self.reader)
+        response = self.client.get(reverse('post-feed'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [post['id'] for post in response.data['results']]
+
+    def test_new_post_is_fanned_out_to_followers(self):
+        self.reader.follow(self.author)
+        post_id = self.create_post(self.author, 'Hello')
+        self.create_post(self.stranger, 'Not followed')
+
+        self.assertTrue(FeedEntry.objects.filter(owner=self.reader, post_id=post_id).exists())
+        self.assertEqual(self.get_feed_ids(), [post_id])
+
+    def test_follow_backfills_and_unfollow_removes(self):
+        post_id = self.create_post(self.author, 'Earlier post')
+        self.assertEqual(self.get_feed_ids(), [])
+
+        self.reader.follow(self.author)
+        self.assertEqual(self.get_feed_ids(), [post_id])
+
+        self.reader.unfollow(self.author)
+        self.assertEqual(self.get_feed_ids(), [])
+
+    @override_settings(FEED_FANOUT_THRESHOLD=0)
+    def test_authors_above_threshold_are_merged_on_read(self):
+        self.reader.follow(self.author)
+        FeedEntry.objects.all().delete()
+        post_id = self.create_post(self.author, 'Celebrity post')
+
+        self.assertFalse(FeedEntry.objects.exists())
+        self.assertEqual(self.get_feed_ids(), [post_id])
+        self.assertEqual(Post.objects.count(), 1)
+
+    @override_settings(FEED_FANOUT_THRESHOLD=1)
+    def test_posts_merged_on_read_survive_author_dropping_below_threshold(self):
+        self.reader.follow(self.author)
+        self.stranger.follow(self.author)
+        post_id = self.create_post(self.author, 'Written as a celebrity')
+        self.assertFalse(FeedEntry.objects.filter(post_id=post_id).exists())
+
+        self.stranger.unfollow(self.author)
+        self.assertEqual(self.get_feed_ids(), [post_id])
+
+    def test_next_links_walk_the_whole_feed(self):
+        self.reader.follow(self.author)
+        post_ids = [self.create_post(self.author, f'Post {i}') for i in range(5)]
+
+        self.client.force_authenticate(user=self.reader)
+        seen = []
+        url = reverse('post-feed') + '?page_size=2'
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            seen.extend(post['id'] for post in response.data['results'])
+            url = response.data['next']
+        self.assertEqual(seen, post_ids[::-1])
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class KeysetPaginationTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='commenter', password='pass12345')
+        self.post = Post.objects.create(author=self.user, title='Post', content='body')
+        for i in range(9):
+            Comment.objects.create(post=self.post, author=self.user, content=f'comment {i}')
+
+    def collect_pages(self, url):
+        ids = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertNotIn('count', response.data)
+            ids.extend(comment['id'] for comment in response.data['results'])
+            url = response.data['next']
+        return ids
+
+    def test_pages_walk_every_comment_once_in_order(self):
+        expected = list(Comment.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+        self.assertEqual(self.collect_pages(reverse('comment-list') + '?page_size=4'), expected)
+
+    def test_rows_sharing_a_timestamp_are_not_skipped(self):
+        Comment.objects.update(created_at=timezone.now())
+        expected = list(Comment.objects.order_by('-id').values_list('id', flat=True))
+        self.assertEqual(self.collect_pages(reverse('comment-list') + '?page_size=2'), expected)
+
+    def test_new_rows_do_not_shift_later_pages(self):
+        first = self.client.get(reverse('comment-list') + '?page_size=3')
+        Comment.objects.create(post=self.post, author=self.user, content='newest')
+        second = self.client.get(first.data['next'])
+        self.assertLess(second.data['results'][0]['id'], first.data['results'][-1]['id'])
+
+    def test_invalid_cursor_is_404(self):
+        response = self.client.get(reverse('comment-list') + '?cursor=not-a-cursor')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class CounterTests(APITestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username='author', password='pass12345')
+        self.fan = User.objects.create_user(username='fan', password='pass12345')
+        self.post = Post.objects.create(author=self.author, title='Post', content='body')
+        self.client.force_authenticate(user=self.fan)
+
+    def test_like_and_unlike_update_likes_count(self):
+        self.client.post(reverse('post-like', args=[self.post.pk]))
+        self.client.post(reverse('post-like', args=[self.post.pk]))
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.likes_count, 1)
+
+        self.client.post(reverse('post-unlike', args=[self.post.pk]))
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.likes_count, 0)
+
+    def test_comment_create_and_delete_update_comments_count(self):
+        response = self.client.post(reverse('comment-list'), {'post': self.post.pk, 'content': 'Nice'})
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 1)
+
+        self.client.delete(reverse('comment-detail', args=[response.data['id']]))
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 0)
+
+    def test_follow_and_unfollow_update_user_counts(self):
+        self.assertTrue(self.fan.follow(self.author))
+        self.assertFalse(self.fan.follow(self.author))
+        self.fan.refresh_from_db()
+        self.author.refresh_from_db()
+        self.assertEqual((self.fan.following_count, self.author.followers_count), (1, 1))
+
+        self.assertTrue(self.fan.unfollow(self.author))
+        self.author.refresh_from_db()
+        self.assertEqual(self.author.followers_count, 0)
+
+    def test_reconcile_counters_repairs_drift(self):
+        Like.objects.create(user=self.fan, post=self.post)
+        Comment.objects.create(post=self.post, author=self.fan, content='Hi')
+        self.fan.following.add(self.author)
+        Post.objects.update(comments_count=7)
+
+        call_command('reconcile_counters', batch_size=1, stdout=StringIO())
+
+        self.post.refresh_from_db()
+        self.author.refresh_from_db()
+        self.assertEqual((self.post.likes_count, self.post.comments_count), (1, 1))
+        self.assertEqual(self.author.followers_count, 1)
+
+
+class QueryCountAssertionsMixin:
+    """Helpers asserting an endpoint's query count does not grow with its data."""
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return len(queries)
+
+    def assertConstantQueries(self, url, grow):
+        """Fetch ``url`` before and after ``grow()`` adds rows; counts must match."""
+        self.client.get(url)  # warm per-process caches
+        before = self.count_queries(url)
+        grow()
+        after = self.count_queries(url)
+        self.assertEqual(before, after, f'{url} went from {before} to {after} queries')
+
+
+# The response cache would hide the queries being counted.
+@override_settings(SECURE_SSL_REDIRECT=False, RESPONSE_CACHE_TIMEOUT=0)
+class QueryCountTests(QueryCountAssertionsMixin, APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.reader = User.objects.create_user(username='reader', password='pass12345')
+        self.post = self.add_posts(1)[0]
+        self.client.force_authenticate(user=self.reader)
+
+    def add_posts(self, n):
+        posts = []
+        for i in range(n):
+            author = User.objects.create_user(username=f'author{Post.objects.count()}', password='x')
+            posts.append(Post.objects.create(author=author, title=f'Post {i}', content='body'))
+        return posts
+
+    def add_comments(self, n):
+        for i in range(n):
+            author = User.objects.create_user(username=f'commenter{Comment.objects.count()}', password='x')
+            Comment.objects.create(post=self.post, author=author, content=f'comment {i}')
+
+    def follow_authors_and_post(self, n):
+        for post in self.add_posts(n):
+            self.reader.follow(post.author)
+
+    def test_post_list(self):
+        self.assertConstantQueries(reverse('post-list'), lambda: self.add_posts(6))
+
+    def test_post_detail(self):
+        self.assertConstantQueries(reverse('post-detail', args=[self.post.pk]), lambda: self.add_comments(6))
+
+    def test_post_comments(self):
+        self.assertConstantQueries(reverse('post-comments', args=[self.post.pk]), lambda: self.add_comments(6))
+
+    def test_comment_list(self):
+        self.assertConstantQueries(reverse('comment-list'), lambda: self.add_comments(6))
+
+    def test_feed(self):
+        self.follow_authors_and_post(1)
+        self.assertConstantQueries(reverse('post-feed'), lambda: self.follow_authors_and_post(6))
+
+
+@override_settings(SECURE_SSL_REDIRECT=False, POST_DETAIL_COMMENTS_LIMIT=3)
+class PostDetailCommentsTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='commenter', password='pass12345')
+        self.post = Post.objects.create(author=self.user, title='Post', content='body')
+
+    def add_comments(self, n):
+        for i in range(n):
+            Comment.objects.create(post=self.post, author=self.user, content=f'comment {i}')
+        Post.objects.filter(pk=self.post.pk).update(comments_count=Comment.objects.count())
+
+    def test_detail_embeds_newest_comments_and_links_to_the_rest(self):
+        self.add_comments(8)
+        newest_first = list(Comment.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+
+        response = self.client.get(reverse('post-detail', args=[self.post.pk]))
+        self.assertEqual([c['id'] for c in response.data['comments']], newest_first[:3])
+        self.assertEqual(response.data['comments_count'], 8)
+
+        rest = self.client.get(response.data['comments_next'] + '&page_size=100')
+        self.assertEqual([c['id'] for c in rest.data['results']], newest_first[3:])
+
+    def test_no_link_when_every_comment_is_embedded(self):
+        self.add_comments(3)
+        response = self.client.get(reverse('post-detail', args=[self.post.pk]))
+        self.assertEqual(len(response.data['comments']), 3)
+        self.assertIsNone(response.data['comments_next'])
+
+
+@override_settings(SECURE_SSL_REDIRECT=False, RESPONSE_CACHE_TIMEOUT=60)
+class ResponseCacheTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='author', password='pass12345')
+        self.post = Post.objects.create(author=self.author, title='Post', content='body')
+
+    def test_repeated_list_is_served_from_cache(self):
+        url = reverse('post-list')
+        self.assertEqual(self.client.get(url)['X-Cache'], 'MISS')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response['X-Cache'], 'HIT')
+        self.assertEqual(len(queries), 0)
+        self.assertEqual(response.data['results'][0]['id'], self.post.pk)
+
+    def test_query_param_order_does_not_split_the_cache(self):
+        self.client.get(reverse('post-list') + f'?author={self.author.pk}&search=Post')
+        response = self.client.get(reverse('post-list') + f'?search=Post&author={self.author.pk}&ordering=')
+        self.assertEqual(response['X-Cache'], 'HIT')
+
+    def test_anonymous_and_authenticated_callers_are_cached_separately(self):
+        url = reverse('post-detail', args=[self.post.pk])
+        self.client.get(url)
+        self.client.force_authenticate(user=self.author)
+        self.assertEqual(self.client.get(url)['X-Cache'], 'MISS')
+
+    def test_writes_invalidate_cached_responses(self):
+        detail = reverse('post-detail', args=[self.post.pk])
+        self.client.get(reverse('post-list'))
+        self.client.get(detail)
+
+        Comment.objects.create(post=self.post, author=self.author, content='New')
+        response = self.client.get(detail)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(len(response.data['comments']), 1)
+
+        Post.objects.create(author=self.author, title='Second', content='body')
+        response = self.client.get(reverse('post-list'))
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(len(response.data['results']), 2)
+
+    def test_comments_only_invalidate_their_post_detail(self):
+        other = Post.objects.create(author=self.author, title='Other', content='body')
+        urls = [reverse('post-list'), reverse('post-detail', args=[self.post.pk]),
+                reverse('post-detail', args=[other.pk])]
+        for url in urls:
+            self.client.get(url)
+        Comment.objects.create(post=self.post, author=self.author, content='New')
+        self.assertEqual([self.client.get(url)['X-Cache'] for url in urls], ['HIT', 'MISS', 'HIT'])
+
+    def test_likes_invalidate_the_lists_and_their_post_detail(self):
+        other = Post.objects.create(author=self.author, title='Other', content='body')
+        urls = [reverse('post-list'), reverse('post-detail', args=[self.post.pk]),
+                reverse('post-detail', args=[other.pk])]
+        self.client.force_authenticate(user=self.author)
+        for url in urls:
+            self.client.get(url)
+        self.client.post(reverse('post-like', args=[self.post.pk]))
+        responses = [self.client.get(url) for url in urls]
+        self.assertEqual([response['X-Cache'] for response in responses], ['MISS', 'MISS', 'HIT'])
+        self.assertTrue(responses[1].data['liked_by_me'])
+
+    def test_unnormalized_detail_url_shares_the_post_namespace(self):
+        self.client.get(reverse('post-detail', args=['0' + str(self.post.pk)]))
+        Comment.objects.create(post=self.post, author=self.author, content='New')
+        response = self.client.get(reverse('post-detail', args=['0' + str(self.post.pk)]))
+        self.assertEqual((response['X-Cache'], len(response.data['comments'])), ('MISS', 1))
+
+
+@override_settings(SECURE_SSL_REDIRECT=False, RESPONSE_CACHE_TIMEOUT=0)
+class ConditionalGetTests(APITestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username='author', password='pass12345')
+        self.post = Post.objects.create(author=self.author, title='Post', content='body')
+        self.url = reverse('post-detail', args=[self.post.pk])
+
+    def test_matching_etag_is_304_with_a_single_query(self):
+        etag = self.client.get(self.url)['ETag']
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response.content, b'')
+        self.assertEqual(response['ETag'], etag)
+        self.assertEqual(len(queries), 1)
+
+    def test_if_modified_since_cannot_hide_a_like(self):
+        response = self.client.get(self.url)
+        self.assertNotIn('Last-Modified', response)
+        self.client.force_authenticate(user=self.author)
+        self.client.post(reverse('post-like', args=[self.post.pk]))
+        # Any date, even one after the like, must not produce a 304.
+        response = self.client.get(self.url, HTTP_IF_MODIFIED_SINCE='Fri, 01 Jan 2100 00:00:00 GMT')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['likes_count'], 1)
+
+    def test_comments_and_likes_change_the_etag(self):
+        etag = self.client.get(self.url)['ETag']
+        Comment.objects.create(post=self.post, author=self.author, content='New')
+        Post.objects.filter(pk=self.post.pk).update(comments_count=1)
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+
+        etag = response['ETag']
+        Post.objects.filter(pk=self.post.pk).update(likes_count=1)
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_200_OK)
+
+    def test_missing_post_is_still_404(self):
+        response = self.client.get(reverse('post-detail', args=[self.post.pk + 1]), HTTP_IF_NONE_MATCH='*')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+@override_settings(SECURE_SSL_REDIRECT=False, NOTIFICATIONS_ASYNC=False)
+class LikeTests(APITestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username='author', password='pass12345')
+        self.fan = User.objects.create_user(username='fan', password='pass12345')
+        self.post = Post.objects.create(author=self.author, title='Post', content='body')
+        self.client.force_authenticate(user=self.fan)
+
+    def post_action(self, name, pk=None):
+        return self.client.post(reverse(f'post-{name}', args=[pk or self.post.pk]))
+
+    def test_like_is_idempotent_and_returns_state(self):
+        first = self.post_action('like')
+        second = self.post_action('like')
+        self.assertEqual(first.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(second.status_code, status.HTTP_200_OK)
+        self.assertEqual((first.data['liked'], first.data['likes_count']), (True, 1))
+        self.assertEqual((second.data['liked'], second.data['likes_count']), (True, 1))
+        self.assertEqual(Like.objects.count(), 1)
+        self.assertEqual(self.author.notifications.count(), 1)
+
+    def test_unlike_is_idempotent_and_returns_state(self):
+        self.post_action('like')
+        first = self.post_action('unlike')
+        second = self.post_action('unlike')
+        self.assertEqual((first.data['liked'], first.data['likes_count']), (False, 0))
+        self.assertEqual((second.status_code, second.data['likes_count']), (status.HTTP_200_OK, 0))
+        self.assertFalse(Like.objects.exists())
+
+    def test_like_and_unlike_are_one_write_plus_the_counter_update(self):
+        for func, write in ((like_post, 'INSERT'), (unlike_post, 'DELETE')):
+            with CaptureQueriesContext(connection) as queries:
+                func(self.fan.pk, self.post.pk)
+            statements = [q['sql'].split()[0] for q in queries if 'SAVEPOINT' not in q['sql']]
+            self.assertEqual(statements, [write, 'UPDATE'])
+
+    def test_zero_padded_pk_notifies_about_the_post(self):
+        self.assertEqual(self.post_action('like', pk=f'{self.post.pk:03d}').status_code, status.HTTP_201_CREATED)
+        notification = self.author.notifications.get()
+        self.assertEqual(notification.target_object_id, self.post.pk)
+        self.assertEqual(notification.target, self.post)
+
+    def test_missing_post_is_404(self):
+        self.assertEqual(self.post_action('like', pk=self.post.pk + 1).status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.post_action('unlike', pk=self.post.pk + 1).status_code, status.HTTP_404_NOT_FOUND)
+        self.assertFalse(Like.objects.exists())
+
+
+@override_settings(SECURE_SSL_REDIRECT=False, RESPONSE_CACHE_TIMEOUT=0)
+class LikedByMeTests(QueryCountAssertionsMixin, APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.reader = User.objects.create_user(username='reader', password='pass12345')
+        self.author = User.objects.create_user(username='author', password='pass12345')
+        self.reader.follow(self.author)
+        self.client.force_authenticate(user=self.author)
+        self.posts = [self.client.post(reverse('post-list'), {'title': f'Post {i}', 'content': 'body'}).data['id']
+                      for i in range(3)]
+        self.client.force_authenticate(user=self.reader)
+        self.client.post(reverse('post-like', args=[self.posts[1]]))
+
+    def test_feed_and_list_show_like_state_and_count(self):
+        for url in (reverse('post-feed'), reverse('post-list')):
+            results = {row['id']: row for row in self.client.get(url).data['results']}
+            self.assertEqual([results[pk]['liked_by_me'] for pk in self.posts], [False, True, False])
+            self.assertEqual([results[pk]['likes_count'] for pk in self.posts], [0, 1, 0])
+
+    def test_like_state_costs_constant_queries(self):
+        def add_liked_posts():
+            for i in range(4):
+                post = Post.objects.create(author=self.author, title=f'More {i}', content='body')
+                Like.objects.create(user=self.reader, post=post)
+        self.assertConstantQueries(reverse('post-list'), add_liked_posts)
+
+    def test_detail_etag_follows_the_callers_like(self):
+        url = reverse('post-detail', args=[self.posts[0]])
+        response = self.client.get(url)
+        self.assertFalse(response.data['liked_by_me'])
+        self.client.post(reverse('post-like', args=[self.posts[0]]))
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.data['liked_by_me'])
+
+    def test_anonymous_callers_see_false(self):
+        self.client.force_authenticate(user=None)
+        response = self.client.get(reverse('post-list'))
+        self.assertFalse(any(row['liked_by_me'] for row in response.data['results']))
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class AsyncFeedViewTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.reader = User.objects.create_user(username='reader', password='pass12345')
+        self.author = User.objects.create_user(username='author', password='pass12345')
+        self.reader.follow(self.author)
+        self.client.force_authenticate(user=self.author)
+        self.posts = [self.client.post(reverse('post-list'), {'title': f'Post {i}', 'content': 'body'}).data['id']
+                      for i in range(3)]
+        self.client.force_authenticate(user=self.reader)
+        self.client.post(reverse('post-like', args=[self.posts[1]]))
+
+    def get_async(self, url):
+        request = APIRequestFactory().get(url)
+        force_authenticate(request, user=self.reader)
+        return async_to_sync(AsyncFeedView.as_view())(request)
+
+    def assertMatchesSyncFeed(self, url):
+        response = self.get_async(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, self.client.get(url).data)
+        return response
+
+    def test_matches_sync_feed(self):
+        response = self.assertMatchesSyncFeed(reverse('feed') + '?page_size=2')
+        self.assertEqual([post['liked_by_me'] for post in response.data['results']], [False, True])
+        self.assertMatchesSyncFeed(response.data['next'])
+
+    @override_settings(FEED_FANOUT_THRESHOLD=0)
+    def test_matches_sync_feed_for_authors_merged_on_read(self):
+        FeedEntry.objects.all().delete()
+        self.assertMatchesSyncFeed(reverse('feed'))
+
+    def test_requires_authentication(self):
+        request = APIRequestFactory().get(reverse('feed'))
+        response = async_to_sync(AsyncFeedView.as_view())(request)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
@@ -1,14 +1,20 @@
+from django.conf import settings
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import PostViewSet, CommentViewSet
+from .views import AsyncFeedView, PostViewSet, CommentViewSet
 
 router = DefaultRouter()
 router.register(r'posts', PostViewSet)
 router.register(r'comments', CommentViewSet)
 
+if getattr(settings, 'ASYNC_VIEWS', False):
+    feed_view = AsyncFeedView.as_view()
+else:
+    feed_view = PostViewSet.as_view({'get': 'feed'}, **PostViewSet.feed.kwargs)
+
 urlpatterns = [
     path('', include(router.urls)),
-    path('feed/', PostViewSet.as_view({'get': 'feed'}), name='feed'),
+    path('feed/', feed_view, name='feed'),
     path('posts/<int:pk>/like/', PostViewSet.as_view({'post': 'like'}), name='post-like'),
     path('posts/<int:pk>/unlike/', PostViewSet.as_view({'post': 'unlike'}), name='post-unlike'),
 ]
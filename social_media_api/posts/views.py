@@ -1,13 +1,22 @@
-from rest_framework import viewsets, permissions, filters, generics, status
+from asgiref.sync import sync_to_async
+from rest_framework import viewsets, permissions, filters, status
 from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
-from django.db.models import Q
+from django.db import transaction
+from django.core.exceptions import ValidationError
+from django.db.models import Exists, F, Max, OuterRef, Prefetch, Value
 from django.contrib.auth import get_user_model
-from django.shortcuts import get_object_or_404
-from django.contrib.contenttypes.models import ContentType
 from .models import Post, Comment, Like
-from .serializers import PostSerializer, PostDetailSerializer, CommentSerializer
+from .serializers import PostSerializer, PostDetailSerializer, CommentSerializer, aload_liked_post_ids
+from .feed import FeedPagination, fan_out_post, feed_queryset
+from .likes import like_post, unlike_post
+from notifications.dispatcher import notify
+from social_media_api.asyncviews import AsyncAPIView
+from social_media_api.cache import CachedResponseMixin, invalidate, object_namespace
+from social_media_api.conditional import ConditionalRetrieveMixin
+from social_media_api.pagination import KeysetPagination
 
 User = get_user_model()
 
@@ -24,8 +33,9 @@ class IsAuthorOrReadOnly(permissions.BasePermission):
         return obj.author == request.user
 
 
-class PostViewSet(viewsets.ModelViewSet):
+class PostViewSet(ConditionalRetrieveMixin, CachedResponseMixin, viewsets.ModelViewSet):
     queryset = Post.objects.all()
+    cache_namespace = 'posts'  # invalidated in posts/signals.py
     permission_classes = [permissions.IsAuthenticatedOrReadOnly, IsAuthorOrReadOnly]
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     search_fields = ['title', 'content']
@@ -33,98 +43,149 @@ class PostViewSet(viewsets.ModelViewSet):
     ordering = ['-created_at']
     filterset_fields = ['author']
 
+    def get_queryset(self):
+        # Every serializer renders the author, and the detail view also
+        # renders each comment's author; load them up front per action.
+        queryset = Post.objects.select_related('author')
+        if self.action == 'retrieve':
+            # Only the newest comments are embedded; one extra row tells the
+            # serializer whether to link to the next page.
+            limit = PostDetailSerializer.recent_comments_limit() + 1
+            recent = Comment.objects.select_related('author').order_by('-created_at', '-id')[:limit]
+            queryset = queryset.prefetch_related(Prefetch('comments', queryset=recent, to_attr='recent_comments'))
+        return queryset
+
+    def get_validators(self, request, *args, **kwargs):
+        # The detail embeds the newest comments, the counters and whether the
+        # caller liked the post, so any of those changes the validator too.
+        # No Last-Modified: likes do not touch updated_at, deleting the newest
+        # comment moves the latest comment time backwards, and liked_by_me is
+        # per caller, so no single timestamp tracks the response. Clients
+        # revalidate with the ETag.
+        liked = Value(False)
+        if request.user.is_authenticated:
+            liked = Exists(Like.objects.filter(user=request.user, post=OuterRef('pk')))
+        try:
+            row = (
+                Post.objects.filter(pk=kwargs[self.lookup_field])
+                .annotate(last_comment_at=Max('comments__updated_at'), liked_by_me=liked)
+                .values_list('pk', 'updated_at', 'likes_count', 'comments_count', 'last_comment_at', 'liked_by_me')
+                .first()
+            )
+        except (TypeError, ValueError, ValidationError):
+            return None
+        if row is None:
+            return None
+        return row, None
+
     def get_serializer_class(self):
         if self.action == 'retrieve':
             return PostDetailSerializer
         return PostSerializer
 
     def perform_create(self, serializer):
-        serializer.save(author=self.request.user)
+        post = serializer.save(author=self.request.user)
+        fan_out_post(post)
 
-    @action(detail=True, methods=['get'])
+    @action(detail=True, methods=['get'], pagination_class=KeysetPagination)
     def comments(self, request, pk=None):
-        """Get all comments for a specific post"""
+        """Get the comments for a specific post, newest first, one page at a time"""
         post = self.get_object()
-        comments = Comment.objects.filter(post=post)
-        serializer = CommentSerializer(comments, many=True)
-        return Response(serializer.data)
+        comments = Comment.objects.filter(post=post).select_related('author')
+        page = self.paginate_queryset(comments)
+        serializer = CommentSerializer(page, many=True, context=self.get_serializer_context())
+        return self.get_paginated_response(serializer.data)
     
-    @action(detail=False, methods=['get'], permission_classes=[permissions.IsAuthenticated])
+    @action(detail=False, methods=['get'], permission_classes=[permissions.IsAuthenticated],
+            pagination_class=FeedPagination)
     def feed(self, request):
         """Get posts from users that the current user follows"""
-        user = request.user
-        following_users = user.following.all()
-        
-        if not following_users.exists():
-            # If user doesn't follow anyone, return empty feed
-            posts = Post.objects.none()
-        else:
-            # Get posts from followed users
-            posts = Post.objects.filter(author__in=following_users).order_by('-created_at')
-        
-        # Apply pagination
+        # Served from the precomputed timeline, see posts/feed.py
+        posts = feed_queryset(request.user)
+
+        # FeedPagination also turns timeline entries back into posts
         page = self.paginate_queryset(posts)
-        if page is not None:
-            serializer = self.get_serializer(page, many=True)
-            return self.get_paginated_response(serializer.data)
-        
-        serializer = self.get_serializer(posts, many=True)
-        return Response(serializer.data)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
     
     @action(detail=True, methods=['post'], permission_classes=[permissions.IsAuthenticated])
     def like(self, request, pk=None):
-        """Like a post"""
-        post = generics.get_object_or_404(Post, pk=pk)
-        user = request.user
-        
-        like, created = Like.objects.get_or_create(user=request.user, post=post)
-        
-        if created:
-            # Create notification for post author
-            from notifications.models import Notification
-            if post.author != user:
-                Notification.objects.create(
-                    recipient=post.author,
-                    actor=user,
-                    verb='liked your post',
-                    target=post
-                )
-            return Response({'message': 'Post liked successfully'}, status=status.HTTP_201_CREATED)
-        else:
-            return Response({'message': 'You have already liked this post'}, status=status.HTTP_400_BAD_REQUEST)
+        """Like a post; liking it again is a no-op. Returns the new like state."""
+        post_id = self.get_post_id(pk)
+        state = like_post(request.user.pk, post_id)
+        if state is None:
+            raise NotFound()
+        if state.changed:
+            # Raw SQL skips the Like signals, so invalidate here; lists show
+            # likes_count and liked_by_me too.
+            invalidate('posts', object_namespace('posts', post_id))
+            # Notify the post author (written in the background)
+            notify(state.author_id, request.user, 'liked your post', target=Post(pk=post_id, author_id=state.author_id))
+        return Response({
+            'message': 'Post liked successfully' if state.changed else 'You have already liked this post',
+            'liked': state.liked,
+            'likes_count': state.likes_count,
+        }, status=status.HTTP_201_CREATED if state.changed else status.HTTP_200_OK)
     
     @action(detail=True, methods=['post'], permission_classes=[permissions.IsAuthenticated])
     def unlike(self, request, pk=None):
-        """Unlike a post"""
-        post = generics.get_object_or_404(Post, pk=pk)
-        user = request.user
-        
+        """Unlike a post; unliking a post that is not liked is a no-op. Returns the new like state."""
+        post_id = self.get_post_id(pk)
+        state = unlike_post(request.user.pk, post_id)
+        if state is None:
+            raise NotFound()
+        if state.changed:
+            invalidate('posts', object_namespace('posts', post_id))
+        return Response({
+            'message': 'Post unliked successfully' if state.changed else 'You have not liked this post',
+            'liked': state.liked,
+            'likes_count': state.likes_count,
+        }, status=status.HTTP_200_OK)
+
+    def get_object_cache_namespace(self):
+        # Normalized so that /posts/007/ shares the namespace that is invalidated.
+        return object_namespace(self.cache_namespace, self.get_post_id(self.kwargs['pk']))
+
+    def get_post_id(self, pk):
         try:
-            like = Like.objects.get(user=user, post=post)
-            like.delete()
-            return Response({'message': 'Post unliked successfully'}, status=status.HTTP_200_OK)
-        except Like.DoesNotExist:
-            return Response({'message': 'You have not liked this post'}, status=status.HTTP_400_BAD_REQUEST)
+            return int(pk)
+        except (TypeError, ValueError):
+            raise NotFound()
+
+
+class AsyncFeedView(AsyncAPIView):
+    """``PostViewSet.feed`` for the ASGI serving mode (see social_media_api/asyncviews.py)."""
+    permission_classes = [permissions.IsAuthenticated]
+
+    async def get(self, request):
+        # Celebrity IDs and the follow graph are normally cache hits.
+        posts = await sync_to_async(feed_queryset)(request.user)
+        paginator = FeedPagination()
+        page = await paginator.apaginate_queryset(posts, request, view=self)
+        await aload_liked_post_ids(request, page)
+        serializer = PostSerializer(page, many=True, context={'request': request, 'view': self})
+        return paginator.get_paginated_response(serializer.data)
 
 
 class CommentViewSet(viewsets.ModelViewSet):
-    queryset = Comment.objects.all()
+    queryset = Comment.objects.select_related('author')
     serializer_class = CommentSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly, IsAuthorOrReadOnly]
-    filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
-    ordering_fields = ['created_at', 'updated_at']
-    ordering = ['-created_at']
+    pagination_class = KeysetPagination
+    filter_backends = [DjangoFilterBackend]
     filterset_fields = ['post', 'author']
 
     def perform_create(self, serializer):
-        comment = serializer.save(author=self.request.user)
+        with transaction.atomic():
+            comment = serializer.save(author=self.request.user)
+            Post.objects.filter(pk=comment.post_id).update(comments_count=F('comments_count') + 1)
         
-        # Create notification for post author
-        from notifications.models import Notification
-        if comment.post.author != self.request.user:
-            Notification.objects.create(
-                recipient=comment.post.author,
-                actor=self.request.user,
-                verb='commented on your post',
-                target=comment.post
+        # Notify the post author (written in the background)
+        notify(comment.post.author_id, self.request.user, 'commented on your post', target=comment.post)
+
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            instance.delete()
+            Post.objects.filter(pk=instance.post_id, comments_count__gt=0).update(
+                comments_count=F('comments_count') - 1
             )
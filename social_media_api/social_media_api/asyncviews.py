@@ -0,0 +1,70 @@
+"""Async DRF views for the ASGI serving mode.
+
+DRF 3.14 only dispatches synchronously, so under ASGI every request to a
+regular ``APIView`` is handed to a thread and holds it for the whole
+request. ``AsyncAPIView`` dispatches as a coroutine instead: authentication,
+permissions and throttling (which may read the cache or database) run through
+``sync_to_async``, and ``async def`` handlers fetch their rows with Django's
+async ORM, so a worker keeps serving other requests while it waits on the
+database.
+
+Handlers must load everything their serializer renders before serializing
+(``select_related``, per-request lookup maps and so on); a lazy query during
+serialization raises ``SynchronousOnlyOperation``. Serializers that cannot
+avoid one should be rendered with ``sync_to_async``.
+
+``ASYNC_VIEWS`` selects these views in the URLconf. They also run under WSGI,
+where Django drives each one in an event loop of its own, at some cost per
+request.
+"""
+import asyncio
+
+from asgiref.sync import sync_to_async
+from rest_framework.generics import GenericAPIView
+from rest_framework.views import APIView
+
+
+class AsyncAPIView(APIView):
+    """``APIView`` whose handlers may be ``async def``."""
+
+    view_is_async = True
+
+    async def dispatch(self, request, *args, **kwargs):
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            await sync_to_async(self.initial)(request, *args, **kwargs)
+            if request.method.lower() in self.http_method_names:
+                handler = getattr(self, request.method.lower(), self.http_method_not_allowed)
+            else:
+                handler = self.http_method_not_allowed
+            response = handler(request, *args, **kwargs)
+            if asyncio.iscoroutine(response):
+                response = await response
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
+
+
+class AsyncListAPIView(AsyncAPIView, GenericAPIView):
+    """``ListAPIView`` that fetches its page with the async ORM.
+
+    The paginator must provide ``apaginate_queryset`` (see
+    ``social_media_api/pagination.py``).
+    """
+
+    async def get(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        page = await self.paginator.apaginate_queryset(queryset, request, view=self)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(await self.serialize(serializer))
+
+    async def serialize(self, serializer):
+        """Return ``serializer.data``; override when rendering needs queries."""
+        return serializer.data
@@ -0,0 +1,135 @@
+"""Response cache for read-heavy list/retrieve endpoints.
+
+Views mixing in ``CachedResponseMixin`` store the serialized ``response.data``
+of successful list/retrieve calls in the ``RESPONSE_CACHE_ALIAS`` cache. Keys
+combine the view's namespace, that namespace's current version, the caller's
+auth scope and the normalized URL, so invalidating a namespace is a single
+``incr`` of its version instead of a scan for matching keys; entries written
+under older versions simply expire. Works with any Django cache backend
+(locmem or file in development and tests, Redis in production).
+
+List responses use the view's ``cache_namespace``; detail responses use one
+namespace per object (``object_namespace()``, e.g. ``posts:42``), so a write
+to one object only drops the lists and that object's own detail. Version
+keys expire after ``RESPONSE_CACHE_VERSION_TIMEOUT`` seconds so that
+per-object versions do not pile up; a restarted version only costs misses.
+
+A response built from a read replica is kept for at most
+``REPLICA_STICKY_SECONDS``: it may predate a write whose invalidation already
+happened, and must not outlive the lag the replica is allowed.
+"""
+import hashlib
+import json
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from rest_framework.response import Response
+
+from .replicas import reading_from_replica
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def get_cache():
+    return caches[_setting('RESPONSE_CACHE_ALIAS', 'default')]
+
+
+def _version_key(namespace):
+    return f'response:{namespace}:version'
+
+
+def get_version(namespace):
+    cache = get_cache()
+    key = _version_key(namespace)
+    version = cache.get(key)
+    if version is None:
+        # Start from the clock rather than 1 so that entries written before
+        # the version key was evicted can never be matched again.
+        cache.add(key, time.time_ns(), _setting('RESPONSE_CACHE_VERSION_TIMEOUT', 86400))
+        version = cache.get(key)
+    return version
+
+
+def bump_version(namespace):
+    cache = get_cache()
+    try:
+        cache.incr(_version_key(namespace))
+    except ValueError:
+        # No version stored yet; the next get_version() starts a fresh one.
+        pass
+
+
+def object_namespace(namespace, pk):
+    """Namespace of the detail responses of object ``pk`` in ``namespace``."""
+    return f'{namespace}:{pk}'
+
+
+def invalidate(*namespaces):
+    """Drop every cached response in ``namespaces``.
+
+    The version is bumped right away so this process stops serving the old
+    data, and again once the transaction commits so a response cached by a
+    concurrent read of the pre-commit state is discarded as well.
+    """
+    for namespace in namespaces:
+        bump_version(namespace)
+        transaction.on_commit(lambda namespace=namespace: bump_version(namespace))
+
+
+class CachedResponseMixin:
+    """Cache ``list`` and ``retrieve`` responses per namespace and auth scope."""
+    cache_namespace = None
+
+    def get_object_cache_namespace(self):
+        lookup = self.lookup_url_kwarg or self.lookup_field
+        return object_namespace(self.cache_namespace, self.kwargs[lookup])
+
+    def get_cache_timeout(self):
+        return _setting('RESPONSE_CACHE_TIMEOUT', 60)
+
+    def get_cache_scope(self, request):
+        user = request.user
+        return f'user:{user.pk}' if user and user.is_authenticated else 'anon'
+
+    def get_cache_key(self, request, namespace):
+        params = sorted(
+            (name, value)
+            for name in request.query_params
+            for value in request.query_params.getlist(name)
+            if value != ''
+        )
+        raw = json.dumps([request.build_absolute_uri(request.path), params, request.accepted_media_type])
+        digest = hashlib.sha256(raw.encode()).hexdigest()
+        version = get_version(namespace)
+        return f'response:{namespace}:{version}:{self.get_cache_scope(request)}:{digest}'
+
+    def cached_response(self, namespace, handler, request, *args, **kwargs):
+        timeout = self.get_cache_timeout()
+        if not timeout or self.cache_namespace is None:
+            return handler(request, *args, **kwargs)
+
+        cache = get_cache()
+        key = self.get_cache_key(request, namespace)
+        data = cache.get(key)
+        if data is not None:
+            response = Response(data)
+            response['X-Cache'] = 'HIT'
+            return response
+
+        response = handler(request, *args, **kwargs)
+        if response.status_code == 200:
+            if reading_from_replica():
+                timeout = min(timeout, _setting('REPLICA_STICKY_SECONDS', 5))
+            cache.set(key, response.data, timeout)
+        response['X-Cache'] = 'MISS'
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(self.cache_namespace, super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(self.get_object_cache_namespace(), super().retrieve, request, *args, **kwargs)
@@ -0,0 +1,56 @@
+"""Database connection budget checks for the gunicorn configuration.
+
+Every worker thread that touches the database holds a connection of its own:
+one per sync worker, one per thread of a gthread worker and one per request
+in flight on an ASGI worker. ``gunicorn.conf.py`` calls
+``check_connection_budget()`` once at startup so that a worker layout that
+could exhaust the database's ``max_connections`` is reported before traffic
+arrives rather than as connection errors under load.
+"""
+from django.conf import settings
+from django.db import DatabaseError, connections
+
+
+def database_connection_limit(using='default'):
+    """Return how many connections this instance may open to ``using``.
+
+    That is the smaller of ``DB_MAX_CONNECTIONS`` and, on PostgreSQL, the
+    server's ``max_connections`` less its superuser reserve. None means no
+    known limit (e.g. SQLite without ``DB_MAX_CONNECTIONS``).
+    """
+    configured = getattr(settings, 'DB_MAX_CONNECTIONS', None)
+    connection = connections[using]
+    if connection.vendor != 'postgresql':
+        return configured
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT current_setting('max_connections')::int"
+                " - current_setting('superuser_reserved_connections')::int"
+            )
+            server_limit = cursor.fetchone()[0]
+    except DatabaseError:
+        return configured
+    finally:
+        # Workers are forked after this runs and must not share the socket.
+        connection.close()
+    return min(configured, server_limit) if configured else server_limit
+
+
+def check_connection_budget(workers, connections_per_worker, using='default'):
+    """Return warnings about the database connections a worker layout needs."""
+    warnings = []
+    needed = workers * connections_per_worker
+    limit = database_connection_limit(using)
+    if limit is not None and needed > limit:
+        warnings.append(
+            f'{workers} worker(s) x {connections_per_worker} connection(s) = {needed} connections to '
+            f'database "{using}", which allows {limit}. Lower WEB_CONCURRENCY, GUNICORN_THREADS or '
+            f'GUNICORN_WORKER_CONNECTIONS, or set DB_MAX_CONNECTIONS to size them automatically.'
+        )
+    if getattr(settings, 'SERVER_MODE', 'wsgi') == 'asgi' and connections[using].settings_dict['CONN_MAX_AGE']:
+        warnings.append(
+            f'Database "{using}" keeps connections open (CONN_MAX_AGE) under ASGI, where each request '
+            f'runs on a new thread and never reuses them. Set DB_CONN_MAX_AGE=0.'
+        )
+    return warnings
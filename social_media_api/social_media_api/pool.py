@@ -0,0 +1,280 @@
+"""In-process database connection pool for the ``pooled_backends`` engines.
+
+Django 4.2 opens a connection per thread and, with ``CONN_MAX_AGE``, keeps it
+for that thread only; without it, every request pays for a new connection.
+The pooled engines wrap the stock PostgreSQL and SQLite backends so that
+``connect()`` takes a connection from a per-process ``ConnectionPool`` and
+``close()`` (run after every request, since ``CONN_MAX_AGE`` is 0) hands it
+back. Threads of a gthread worker, or the per-request threads of an ASGI
+worker, then share ``max_size`` warm connections and wait up to ``timeout``
+seconds when all of them are busy.
+
+Since ``CONN_MAX_AGE`` is 0, Django's ``CONN_HEALTH_CHECKS`` never runs for
+pooled connections. Instead, a connection that sat idle for more than
+``check_idle`` seconds is pinged before it is handed out, and replaced when
+it is dead (database restart, failover, server-side idle timeout), so the
+request gets a working connection instead of an ``OperationalError``.
+
+The pool is configured the way Django 5.1's built-in PostgreSQL pool is::
+
+    'OPTIONS': {'pool': {'min_size': 2, 'max_size': 10, 'timeout': 30}}
+
+``pool_stats()`` reports each pool's counters for the metrics endpoint.
+"""
+import os
+import threading
+import time
+from collections import deque
+
+DEFAULT_POOL_OPTIONS = {
+    'min_size': 0,
+    'max_size': 10,
+    'timeout': 30.0,  # seconds to wait for a free connection
+    'max_idle': 600.0,  # seconds before a spare idle connection is closed
+    'check_idle': 5.0,  # seconds idle after which a connection is pinged before reuse
+}
+
+
+class PoolTimeout(Exception):
+    pass
+
+
+class ConnectionPool:
+    """Thread-safe pool of DB-API connections made by a ``connect`` callable."""
+
+    def __init__(self, min_size=0, max_size=10, timeout=30.0, max_idle=600.0, check_idle=5.0):
+        if not 0 <= min_size <= max_size or max_size < 1:
+            raise ValueError('Pool sizes need 0 <= min_size <= max_size and max_size >= 1.')
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self.check_idle = check_idle
+        self._idle = deque()  # (connection, returned_at), most recently returned last
+        self._size = 0
+        self._filled = False
+        self._condition = threading.Condition()
+        self._counters = dict.fromkeys(
+            ['acquired', 'waited', 'timeouts', 'failed_checks', 'connections_opened', 'connections_closed'], 0
+        )
+        self._waiting = 0
+        self._wait_seconds = 0.0
+
+    def acquire(self, connect, check=None):
+        """Return an idle connection, or open one with ``connect()`` if below ``max_size``.
+
+        An idle connection unused for more than ``check_idle`` seconds is
+        passed to ``check`` first; if that returns False or raises, the
+        connection is discarded and another one is taken or opened.
+        """
+        if not self._filled:
+            self._fill(connect)
+        started = time.monotonic()
+        deadline = started + self.timeout
+        waited = False
+        while True:
+            stale = []
+            with self._condition:
+                while True:
+                    stale.extend(self._take_stale())
+                    if self._idle:
+                        connection, returned_at = self._idle.pop()
+                        break
+                    if self._size < self.max_size:
+                        self._size += 1
+                        connection = returned_at = None
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._counters['timeouts'] += 1
+                        self._close_all(stale)
+                        raise PoolTimeout(
+                            f'No database connection became free within {self.timeout}s '
+                            f'(pool max_size={self.max_size}).'
+                        )
+                    waited = True
+                    self._waiting += 1
+                    self._condition.wait(remaining)
+                    self._waiting -= 1
+            self._close_all(stale)
+            if connection is None:
+                connection = self._open(connect)
+            elif check is not None and time.monotonic() - returned_at > self.check_idle:
+                if not self._passes(check, connection):
+                    with self._condition:
+                        self._counters['failed_checks'] += 1
+                    self.release(connection, discard=True)
+                    continue
+            break
+        with self._condition:
+            self._counters['acquired'] += 1
+            if waited:
+                self._counters['waited'] += 1
+                self._wait_seconds += time.monotonic() - started
+        return connection
+
+    def release(self, connection, discard=False):
+        """Return ``connection`` to the pool, or close it if ``discard`` or it cannot roll back."""
+        if not discard:
+            try:
+                # Leave no transaction open for the next borrower.
+                connection.rollback()
+            except Exception:
+                discard = True
+        with self._condition:
+            if discard:
+                self._size -= 1
+            else:
+                self._idle.append((connection, time.monotonic()))
+            self._condition.notify()
+        if discard:
+            self._close_all([connection])
+
+    def close(self):
+        """Close the idle connections, e.g. before the process forks."""
+        with self._condition:
+            idle = [connection for connection, _ in self._idle]
+            self._idle.clear()
+            self._size -= len(idle)
+            self._filled = False
+        self._close_all(idle)
+
+    def stats(self):
+        with self._condition:
+            idle = len(self._idle)
+            return {
+                'min_size': self.min_size,
+                'max_size': self.max_size,
+                'size': self._size,
+                'idle': idle,
+                'in_use': self._size - idle,
+                'waiting': self._waiting,
+                'wait_ms_total': round(self._wait_seconds * 1000, 3),
+                **self._counters,
+            }
+
+    def _fill(self, connect):
+        with self._condition:
+            if self._filled:
+                return
+            self._filled = True
+        for _ in range(self.min_size):
+            with self._condition:
+                if self._size >= self.min_size:
+                    return
+                self._size += 1
+            self.release(self._open(connect))
+
+    @staticmethod
+    def _passes(check, connection):
+        try:
+            return check(connection)
+        except Exception:
+            return False
+
+    def _open(self, connect):
+        try:
+            connection = connect()
+        except Exception:
+            with self._condition:
+                self._size -= 1
+                self._condition.notify()
+            raise
+        with self._condition:
+            self._counters['connections_opened'] += 1
+        return connection
+
+    def _take_stale(self):
+        # The oldest idle connections are at the left; keep min_size of them.
+        stale = []
+        cutoff = time.monotonic() - self.max_idle
+        while self._idle and self._idle[0][1] < cutoff and self._size > self.min_size:
+            stale.append(self._idle.popleft()[0])
+            self._size -= 1
+        return stale
+
+    def _close_all(self, connections_to_close):
+        for connection in connections_to_close:
+            try:
+                connection.close()
+            except Exception:
+                pass
+        if connections_to_close:
+            with self._condition:
+                self._counters['connections_closed'] += len(connections_to_close)
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+_pools_pid = os.getpid()
+# Pools inherited from a parent process. Their sockets still belong to the
+# parent, so they are kept referenced and never closed in the child.
+_inherited_pools = []
+
+
+def get_pool(alias, options):
+    global _pools_pid
+    with _pools_lock:
+        if os.getpid() != _pools_pid:
+            _inherited_pools.extend(_pools.values())
+            _pools.clear()
+            _pools_pid = os.getpid()
+        pool = _pools.get(alias)
+        if pool is None:
+            pool = _pools[alias] = ConnectionPool(**{**DEFAULT_POOL_OPTIONS, **options})
+        return pool
+
+
+def pool_stats():
+    """Return ``{alias: stats}`` for the pools opened by this process."""
+    with _pools_lock:
+        pools = dict(_pools) if os.getpid() == _pools_pid else {}
+    return {alias: pool.stats() for alias, pool in pools.items()}
+
+
+def close_pools():
+    """Close every idle pooled connection of this process."""
+    with _pools_lock:
+        pools = list(_pools.values()) if os.getpid() == _pools_pid else []
+    for pool in pools:
+        pool.close()
+
+
+class PooledDatabaseWrapperMixin:
+    """Borrow connections from, and return them to, the alias's ``ConnectionPool``."""
+
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        params.pop('pool', None)
+        return params
+
+    @property
+    def pool(self):
+        return get_pool(self.alias, self.settings_dict['OPTIONS'].get('pool') or {})
+
+    @staticmethod
+    def _ping(connection):
+        cursor = connection.cursor()
+        try:
+            cursor.execute('SELECT 1')
+        finally:
+            cursor.close()
+        connection.rollback()
+        return True
+
+    def get_new_connection(self, conn_params):
+        connect = super().get_new_connection
+        try:
+            return self.pool.acquire(lambda: connect(conn_params), check=self._ping)
+        except PoolTimeout as exc:
+            # Surfaces as django.db.OperationalError.
+            raise self.Database.OperationalError(str(exc)) from exc
+
+    def _close(self):
+        if self.connection is None:
+            return
+        # A connection closed inside atomic() stays referenced by this
+        # wrapper, and one that raised errors may be broken: drop both.
+        discard = self.in_atomic_block or self.errors_occurred
+        with self.wrap_database_errors:
+            self.pool.release(self.connection, discard=discard)
@@ -0,0 +1,4 @@
+"""Database engines that share connections through ``social_media_api.pool``.
+
+Select them with ``DB_POOL=true`` (see settings.py) rather than by hand.
+"""
@@ -0,0 +1,124 @@
+"""Read-replica routing.
+
+``DATABASE_REPLICA_URLS`` adds one alias per replica (``replica1``,
+``replica2``, ...) next to ``default``, the primary. For each request
+``ReplicaRoutingMiddleware`` decides where ORM reads go and ``ReplicaRouter``
+applies that decision:
+
+* ``GET``, ``HEAD`` and ``OPTIONS`` requests read from one replica, picked at
+  random per request so every query in it sees the same snapshot.
+* Writes, and every query of a non-safe request, go to the primary.
+* After a client writes, its safe requests read from the primary for
+  ``REPLICA_STICKY_SECONDS`` so it sees its own changes despite replication
+  lag. The pin is scoped to the ``Authorization`` header, through an entry in
+  the default cache, and to a ``REPLICA_PIN_COOKIE`` cookie for clients that
+  keep cookies (sessions, the admin). The cache entry is per process unless
+  the cache is shared (Redis), so API clients stay pinned across workers
+  only with a shared cache.
+* Code running outside a request (management commands, background threads)
+  always uses the primary.
+
+Reads whose result is cached for long, such as token lookups and the follow
+graph, wrap them in ``use_primary()`` so a lagging replica cannot pin stale
+data in the cache.
+"""
+import contextvars
+import hashlib
+import random
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.utils.deprecation import MiddlewareMixin
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+# The alias reads go to in the current request, or None to use the primary.
+_read_alias = contextvars.ContextVar('replica_read_alias', default=None)
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def replica_aliases():
+    return _setting('REPLICA_DATABASES', [])
+
+
+def current_read_alias():
+    """Return the alias ORM reads use right now."""
+    return _read_alias.get() or DEFAULT_DB_ALIAS
+
+
+def reading_from_replica():
+    return current_read_alias() != DEFAULT_DB_ALIAS
+
+
+@contextmanager
+def use_primary():
+    """Send the reads made inside the block to the primary."""
+    token = _read_alias.set(None)
+    try:
+        yield
+    finally:
+        _read_alias.reset(token)
+
+
+def _pin_key(authorization):
+    # Never put raw credentials into cache keys.
+    return 'replica:pin:' + hashlib.sha256(authorization.encode()).hexdigest()
+
+
+def is_pinned(request):
+    """True if the client wrote within the last ``REPLICA_STICKY_SECONDS``."""
+    if request.COOKIES.get(_setting('REPLICA_PIN_COOKIE', 'replica_pin')):
+        return True
+    authorization = request.META.get('HTTP_AUTHORIZATION')
+    return bool(authorization) and cache.get(_pin_key(authorization)) is not None
+
+
+def pin(request, response):
+    """Read from the primary for this client's next ``REPLICA_STICKY_SECONDS``."""
+    seconds = _setting('REPLICA_STICKY_SECONDS', 5)
+    if not seconds:
+        return
+    authorization = request.META.get('HTTP_AUTHORIZATION')
+    if authorization:
+        cache.set(_pin_key(authorization), True, seconds)
+    response.set_cookie(
+        _setting('REPLICA_PIN_COOKIE', 'replica_pin'), '1', max_age=seconds,
+        secure=request.is_secure(), httponly=True, samesite='Lax',
+    )
+
+
+class ReplicaRoutingMiddleware(MiddlewareMixin):
+    """Route a request's reads to a replica, and pin clients after writes."""
+
+    def process_request(self, request):
+        aliases = replica_aliases()
+        if aliases and request.method in SAFE_METHODS and not is_pinned(request):
+            _read_alias.set(random.choice(aliases))
+        else:
+            _read_alias.set(None)
+
+    def process_response(self, request, response):
+        _read_alias.set(None)
+        if replica_aliases() and request.method not in SAFE_METHODS:
+            pin(request, response)
+        return response
+
+
+class ReplicaRouter:
+    """Database router for ``DATABASE_ROUTERS`` (see module docstring)."""
+
+    def db_for_read(self, model, **hints):
+        return current_read_alias()
+
+    def db_for_write(self, model, **hints):
+        # Objects read from a replica carry its alias; save them to the primary.
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Every alias holds the same data.
+        return True
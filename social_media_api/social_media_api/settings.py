@@ -3,6 +3,8 @@
 import os
 from pathlib import Path
 
+from django.core.exceptions import ImproperlyConfigured
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -31,6 +33,7 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
+    'social_media_api.replicas.ReplicaRoutingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -59,13 +62,32 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'social_media_api.wsgi.application'
 
+# Serving mode. SERVER_MODE=asgi runs uvicorn workers under gunicorn (see
+# gunicorn.conf.py) and serves the feed, notification list and profile from
+# async views (see social_media_api/asyncviews.py). ASYNC_VIEWS can be set on
+# its own, e.g. for `uvicorn social_media_api.asgi:application`.
+SERVER_MODE = os.environ.get('SERVER_MODE', 'wsgi').lower()
+ASYNC_VIEWS = os.environ.get('ASYNC_VIEWS', str(SERVER_MODE == 'asgi')).lower() == 'true'
+
 # Database configuration
 import dj_database_url
 
+# Each sync worker, or gthread worker thread, keeps its own connection open
+# for DB_CONN_MAX_AGE seconds. Under ASGI requests run on short-lived threads
+# that never reuse a connection, so it is closed after each request instead.
+# DB_MAX_CONNECTIONS is how many connections this instance may open; gunicorn
+# sizes its workers to it and warns at startup when they could exceed it
+# (see gunicorn.conf.py and social_media_api/capacity.py).
+# With DB_POOL=true connections are instead borrowed from a per-process pool
+# for each request (see social_media_api/pool.py).
+DB_POOL = os.environ.get('DB_POOL', 'False').lower() == 'true'
+DB_CONN_MAX_AGE = int(os.environ.get('DB_CONN_MAX_AGE', '0' if SERVER_MODE == 'asgi' or DB_POOL else '600'))
+DB_MAX_CONNECTIONS = int(os.environ.get('DB_MAX_CONNECTIONS', '0')) or None
+
 DATABASES = {
     'default': dj_database_url.config(
         default=f'sqlite:///{BASE_DIR / "db.sqlite3"}',
-        conn_max_age=600,
+        conn_max_age=DB_CONN_MAX_AGE,
         conn_health_checks=True,
     )
 }
@@ -73,7 +95,9 @@ DATABASES = {
 # Database credentials setup for production
 DATABASE_URL = os.environ.get('DATABASE_URL')
 if DATABASE_URL:
-    DATABASES['default'] = dj_database_url.parse(DATABASE_URL)
+    DATABASES['default'] = dj_database_url.parse(
+        DATABASE_URL, conn_max_age=DB_CONN_MAX_AGE, conn_health_checks=True,
+    )
 
 # Database configuration with explicit credentials
 DB_NAME = os.environ.get('DB_NAME')
@@ -90,10 +114,80 @@ if DB_NAME and DB_USER and DB_PASSWORD:
         'PASSWORD': DB_PASSWORD,
         'HOST': DB_HOST,
         'PORT': PORT,
+        'CONN_MAX_AGE': DB_CONN_MAX_AGE,
+        'CONN_HEALTH_CHECKS': True,
     }
 
+# Read replicas: a comma-separated list of database URLs, configured like
+# DATABASE_URL and added as the aliases replica1, replica2, ... Safe-method
+# requests read from one of them unless the client wrote within the last
+# REPLICA_STICKY_SECONDS, which should exceed the usual replication lag (see
+# social_media_api/replicas.py). Locally two SQLite files stand in for a
+# primary and a replica.
+DATABASE_REPLICA_URLS = [url.strip() for url in os.environ.get('DATABASE_REPLICA_URLS', '').split(',') if url.strip()]
+for number, url in enumerate(DATABASE_REPLICA_URLS, start=1):
+    DATABASES[f'replica{number}'] = dj_database_url.parse(
+        url, conn_max_age=DB_CONN_MAX_AGE, conn_health_checks=True,
+        test_options={'MIRROR': 'default'},
+    )
+REPLICA_DATABASES = [alias for alias in DATABASES if alias != 'default']
+REPLICA_STICKY_SECONDS = int(os.environ.get('REPLICA_STICKY_SECONDS', '5'))
+REPLICA_PIN_COOKIE = 'replica_pin'
+DATABASE_ROUTERS = ['social_media_api.replicas.ReplicaRouter'] if len(DATABASES) > 1 else []
+# Tests run against mirrors of the test database with routing off; see
+# social_media_api/test_runner.py.
+TEST_RUNNER = 'social_media_api.test_runner.ReplicaMirrorTestRunner'
+
+# Pool sizes are per process: gunicorn.conf.py caps DB_POOL_MAX_SIZE to each
+# worker's share of DB_MAX_CONNECTIONS. Requests wait up to DB_POOL_TIMEOUT
+# seconds for a free connection before failing.
+POOLED_ENGINES = {
+    'django.db.backends.postgresql': 'social_media_api.pooled_backends.postgresql',
+    'django.db.backends.sqlite3': 'social_media_api.pooled_backends.sqlite3',
+}
+# Each alias, replicas included, gets a pool of its own.
+if DB_POOL:
+    for database in DATABASES.values():
+        if database['ENGINE'] not in POOLED_ENGINES:
+            raise ImproperlyConfigured(f"DB_POOL does not support {database['ENGINE']}.")
+        database['ENGINE'] = POOLED_ENGINES[database['ENGINE']]
+        # Every request returns its connection to the pool when it finishes.
+        database['CONN_MAX_AGE'] = 0
+        database.setdefault('OPTIONS', {})['pool'] = {
+            'min_size': int(os.environ.get('DB_POOL_MIN_SIZE', '0')),
+            'max_size': int(os.environ.get('DB_POOL_MAX_SIZE', '10')),
+            'timeout': float(os.environ.get('DB_POOL_TIMEOUT', '30')),
+        }
+
 AUTH_PASSWORD_VALIDATORS = []
 
+# Password hashing. New hashes use PASSWORD_HASHER ('argon2', 'pbkdf2' or
+# 'scrypt'); the others stay listed so existing hashes still verify and are
+# re-hashed with the preferred one on the user's next successful login.
+# Argon2 needs the optional argon2-cffi package and is the default when it is
+# installed (see accounts/hashers.py for the cost parameters).
+try:
+    import argon2  # noqa: F401
+    _DEFAULT_PASSWORD_HASHER = 'argon2'
+except ImportError:
+    _DEFAULT_PASSWORD_HASHER = 'pbkdf2'
+PASSWORD_HASHER = os.environ.get('PASSWORD_HASHER', _DEFAULT_PASSWORD_HASHER)
+_PASSWORD_HASHERS = {
+    'argon2': 'accounts.hashers.TunedArgon2PasswordHasher',
+    'pbkdf2': 'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+    'scrypt': 'django.contrib.auth.hashers.ScryptPasswordHasher',
+}
+PASSWORD_HASHERS = [_PASSWORD_HASHERS[PASSWORD_HASHER]] + [
+    path for name, path in _PASSWORD_HASHERS.items() if name != PASSWORD_HASHER
+] + ['django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher']
+ARGON2_TIME_COST = int(os.environ.get('ARGON2_TIME_COST', '2'))
+ARGON2_MEMORY_COST = int(os.environ.get('ARGON2_MEMORY_COST', '19456'))  # KiB
+ARGON2_PARALLELISM = int(os.environ.get('ARGON2_PARALLELISM', '1'))
+# At most this many password hashes are computed at once per process
+# (default: CPU count); extra sign-ins wait LOGIN_QUEUE_TIMEOUT seconds, then 429.
+LOGIN_MAX_CONCURRENT_CHECKS = int(os.environ.get('LOGIN_MAX_CONCURRENT_CHECKS', '0')) or None
+LOGIN_QUEUE_TIMEOUT = 5
+
 LANGUAGE_CODE = 'en-us'
 
 TIME_ZONE = 'UTC'
@@ -152,7 +246,7 @@ AUTH_USER_MODEL = 'accounts.User'
 # DRF config
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework.authentication.TokenAuthentication',
+        'social_media_api.authentication.CachedTokenAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
@@ -160,3 +254,70 @@ REST_FRAMEWORK = {
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 10,
 }
+
+# Home timeline fan-out (see posts/feed.py). Authors with more followers than
+# the threshold are merged into feeds at read time instead of on write.
+FEED_FANOUT_THRESHOLD = int(os.environ.get('FEED_FANOUT_THRESHOLD', '10000'))
+FEED_FANOUT_BATCH_SIZE = 1000
+FEED_BACKFILL_LIMIT = int(os.environ.get('FEED_BACKFILL_LIMIT', '200'))
+FEED_CELEBRITY_CACHE_TIMEOUT = 300
+
+# Number of "people you may know" suggestions stored per user by
+# `manage.py compute_suggestions`.
+SUGGESTIONS_TOP_K = 20
+# Most user IDs accepted by one batch follow request.
+FOLLOW_BATCH_LIMIT = 500
+
+# Notifications are written by a background thread in batches (see
+# notifications/dispatcher.py). Set NOTIFICATIONS_ASYNC=False to write inline.
+NOTIFICATIONS_ASYNC = os.environ.get('NOTIFICATIONS_ASYNC', 'True').lower() == 'true'
+NOTIFICATIONS_QUEUE_SIZE = 10000
+NOTIFICATIONS_BATCH_SIZE = 100
+NOTIFICATIONS_FLUSH_INTERVAL = 0.2
+# Fold repeated (recipient, verb, target) events within this many seconds into
+# one unread notification ("X and 41 others liked your post"). 0 disables.
+NOTIFICATIONS_AGGREGATE_WINDOW = int(os.environ.get('NOTIFICATIONS_AGGREGATE_WINDOW', '3600'))
+NOTIFICATIONS_ACTOR_SAMPLE_SIZE = 5
+
+# Response cache for read-heavy endpoints (see social_media_api/cache.py).
+# Without REDIS_URL a per-process local-memory cache is used.
+REDIS_URL = os.environ.get('REDIS_URL')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+RESPONSE_CACHE_ALIAS = 'default'
+# Token -> user lookups are cached too (see social_media_api/authentication.py);
+# logout, password changes and deactivation invalidate them. 0 disables, the
+# default without REDIS_URL: a local-memory cache is per process, so the other
+# workers would keep accepting a revoked token until its entry expired.
+AUTH_TOKEN_CACHE_ALIAS = 'default'
+AUTH_TOKEN_CACHE_TIMEOUT = int(os.environ.get('AUTH_TOKEN_CACHE_TIMEOUT', '300' if REDIS_URL else '0'))
+RESPONSE_CACHE_TIMEOUT = int(os.environ.get('RESPONSE_CACHE_TIMEOUT', '60'))
+
+# Cached follow graph (see accounts/graph.py). Users with more edges than
+# GRAPH_MAX_CACHED_IDS on one side are looked up in the database instead.
+# Follows drop the affected sets only in this process's cache unless REDIS_URL
+# shares it, so other workers may serve a changed set until it expires.
+GRAPH_CACHE_TIMEOUT = int(os.environ.get('GRAPH_CACHE_TIMEOUT', '3600' if REDIS_URL else '60'))
+GRAPH_MAX_CACHED_IDS = 50000
+
+# Unread notification counts (see notifications/unread.py). Writes drop the
+# count only in this process's cache unless REDIS_URL shares it, so without
+# Redis caching is off (0) rather than showing other workers' stale badges.
+NOTIFICATIONS_UNREAD_CACHE_TIMEOUT = int(
+    os.environ.get('NOTIFICATIONS_UNREAD_CACHE_TIMEOUT', '300' if REDIS_URL else '0')
+)
+
+# Number of newest comments embedded in a post detail response; the rest are
+# paged through /api/posts/<id>/comments/.
+POST_DETAIL_COMMENTS_LIMIT = 10
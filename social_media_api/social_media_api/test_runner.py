@@ -0,0 +1,42 @@
+"""Test runner that wires up read replicas for the suite.
+
+Every replica alias becomes a mirror of the test database (TEST MIRROR), and
+``replica1`` is added when none is configured so the routing tests always
+run. A mirror has a connection of its own, which cannot see the transaction a
+TestCase runs in, so reads stay on the primary (``REPLICA_DATABASES = []``)
+unless a test turns routing on (see ReadReplicaTests in
+social_media_api/tests.py).
+
+Other runners (pytest-django, ...) get the same setup by calling
+``mirror_replicas()`` before the test databases are created and enabling the
+``override_settings`` it returns.
+"""
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+def mirror_replicas():
+    """Make every replica alias a test mirror; return the settings for tests."""
+    databases = connections.settings
+    if 'replica1' not in databases:
+        default = databases[DEFAULT_DB_ALIAS]
+        databases['replica1'] = {**default, 'TEST': dict(default['TEST'])}
+    for alias, settings_dict in databases.items():
+        if alias != DEFAULT_DB_ALIAS:
+            settings_dict['TEST']['MIRROR'] = DEFAULT_DB_ALIAS
+    return override_settings(
+        REPLICA_DATABASES=[],
+        DATABASE_ROUTERS=['social_media_api.replicas.ReplicaRouter'],
+    )
+
+
+class ReplicaMirrorTestRunner(DiscoverRunner):
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._replica_settings = mirror_replicas()
+        self._replica_settings.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self._replica_settings.disable()
+        super().teardown_test_environment(**kwargs)
@@ -0,0 +1,320 @@
+import os
+import runpy
+import tempfile
+import threading
+from pathlib import Path
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import OperationalError, connections
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITestCase, APITransactionTestCase
+
+from posts.models import Post
+
+from .capacity import check_connection_budget
+from .pool import ConnectionPool, PoolTimeout
+from .pooled_backends.sqlite3.base import DatabaseWrapper as PooledSQLiteWrapper
+from .replicas import ReplicaRouter, ReplicaRoutingMiddleware, current_read_alias, use_primary
+
+User = get_user_model()
+
+GUNICORN_CONF = Path(__file__).resolve().parent.parent / 'gunicorn.conf.py'
+
+
+class GunicornConfigTests(SimpleTestCase):
+    def load(self, **env):
+        with mock.patch.dict(os.environ, {key: str(value) for key, value in env.items()}):
+            for name in ('SERVER_MODE', 'WEB_CONCURRENCY', 'GUNICORN_THREADS', 'GUNICORN_WORKER_CONNECTIONS',
+                         'DB_MAX_CONNECTIONS', 'DB_POOL', 'DB_POOL_MAX_SIZE'):
+                if name not in env:
+                    os.environ.pop(name, None)
+            with mock.patch('os.sched_getaffinity', return_value=set(range(4)), create=True):
+                return runpy.run_path(str(GUNICORN_CONF))
+
+    def test_defaults_follow_the_available_cpus(self):
+        config = self.load()
+        self.assertEqual((config['worker_class'], config['workers']), ('sync', 9))
+        config = self.load(GUNICORN_THREADS=4)
+        self.assertEqual((config['worker_class'], config['workers'], config['threads']), ('gthread', 5, 4))
+        config = self.load(SERVER_MODE='asgi')
+        self.assertEqual((config['worker_class'], config['workers']), ('social_media_api.workers.UvicornWorker', 4))
+        self.assertEqual(config['wsgi_app'], 'social_media_api.asgi:application')
+
+    def test_database_budget_caps_connections(self):
+        config = self.load(DB_MAX_CONNECTIONS=6)
+        self.assertEqual(config['workers'] * config['connections_per_worker'], 6)
+        config = self.load(GUNICORN_THREADS=8, DB_MAX_CONNECTIONS=20)
+        self.assertEqual((config['workers'], config['threads']), (5, 4))
+        config = self.load(SERVER_MODE='asgi', DB_MAX_CONNECTIONS=100)
+        self.assertEqual((config['workers'], config['worker_connections']), (4, 25))
+
+    def test_pooled_workers_keep_their_threads_and_size_the_pool(self):
+        config = self.load(GUNICORN_THREADS=8, DB_MAX_CONNECTIONS=20, DB_POOL='true')
+        self.assertEqual((config['workers'], config['threads'], config['pool_max_size']), (5, 8, 4))
+        self.assertEqual(config['connections_per_worker'], 4)
+
+
+class ConnectionBudgetTests(SimpleTestCase):
+    @override_settings(DB_MAX_CONNECTIONS=20)
+    def test_warns_only_when_workers_could_exceed_the_limit(self):
+        self.assertEqual(check_connection_budget(workers=5, connections_per_worker=4), [])
+        [warning] = check_connection_budget(workers=9, connections_per_worker=4)
+        self.assertIn('36 connections', warning)
+
+    @override_settings(DB_MAX_CONNECTIONS=None)
+    def test_no_limit_no_warning(self):
+        self.assertEqual(check_connection_budget(workers=100, connections_per_worker=100), [])
+
+    @override_settings(SERVER_MODE='asgi', DB_MAX_CONNECTIONS=None)
+    def test_warns_about_persistent_connections_under_asgi(self):
+        with mock.patch.dict(connections['default'].settings_dict, CONN_MAX_AGE=600):
+            [warning] = check_connection_budget(workers=1, connections_per_worker=1)
+        self.assertIn('DB_CONN_MAX_AGE=0', warning)
+
+
+class FakeConnection:
+    def __init__(self, broken=False):
+        self.broken = broken
+        self.closed = False
+
+    def rollback(self):
+        if self.broken:
+            raise OSError('connection lost')
+
+    def close(self):
+        self.closed = True
+
+
+class ConnectionPoolTests(SimpleTestCase):
+    def test_released_connections_are_reused(self):
+        pool = ConnectionPool(max_size=2)
+        first = pool.acquire(FakeConnection)
+        pool.release(first)
+        self.assertIs(pool.acquire(FakeConnection), first)
+        stats = pool.stats()
+        self.assertEqual((stats['connections_opened'], stats['acquired'], stats['in_use']), (1, 2, 1))
+
+    def test_min_size_is_opened_up_front(self):
+        pool = ConnectionPool(min_size=3, max_size=5)
+        pool.acquire(FakeConnection)
+        self.assertEqual(pool.stats()['size'], 3)
+        self.assertEqual(pool.stats()['idle'], 2)
+
+    def test_acquire_times_out_when_every_connection_is_busy(self):
+        pool = ConnectionPool(max_size=1, timeout=0.05)
+        pool.acquire(FakeConnection)
+        with self.assertRaises(PoolTimeout):
+            pool.acquire(FakeConnection)
+        self.assertEqual(pool.stats()['timeouts'], 1)
+
+    def test_waiter_gets_the_released_connection(self):
+        pool = ConnectionPool(max_size=1, timeout=5)
+        held = pool.acquire(FakeConnection)
+        got = []
+        waiter = threading.Thread(target=lambda: got.append(pool.acquire(FakeConnection)))
+        waiter.start()
+        while not pool.stats()['waiting']:
+            pass
+        pool.release(held)
+        waiter.join()
+        self.assertEqual(got, [held])
+        self.assertEqual(pool.stats()['waited'], 1)
+
+    def test_broken_and_discarded_connections_are_closed(self):
+        pool = ConnectionPool(max_size=2)
+        broken = pool.acquire(lambda: FakeConnection(broken=True))
+        pool.release(broken)
+        discarded = pool.acquire(FakeConnection)
+        pool.release(discarded, discard=True)
+        self.assertTrue(broken.closed and discarded.closed)
+        self.assertEqual(pool.stats()['size'], 0)
+
+    def test_idle_connections_failing_the_check_are_replaced(self):
+        pool = ConnectionPool(max_size=1, check_idle=0)
+        dead = pool.acquire(FakeConnection)
+        pool.release(dead)
+        fresh = pool.acquire(FakeConnection, check=lambda connection: connection is not dead)
+        self.assertIsNot(fresh, dead)
+        self.assertTrue(dead.closed)
+        stats = pool.stats()
+        self.assertEqual((stats['failed_checks'], stats['size'], stats['connections_opened']), (1, 1, 2))
+
+    def test_recently_used_connections_skip_the_check(self):
+        pool = ConnectionPool(max_size=1, check_idle=60)
+        first = pool.acquire(FakeConnection)
+        pool.release(first)
+        self.assertIs(pool.acquire(FakeConnection, check=lambda connection: 1 / 0), first)
+
+    def test_spare_idle_connections_expire(self):
+        pool = ConnectionPool(max_size=2, max_idle=0)
+        old = pool.acquire(FakeConnection)
+        pool.release(old)
+        self.assertIsNot(pool.acquire(FakeConnection), old)
+        self.assertTrue(old.closed)
+
+
+class PooledBackendTests(SimpleTestCase):
+    def make_wrapper(self, path, **pool_options):
+        settings_dict = {
+            **connections['default'].settings_dict,
+            'ENGINE': 'social_media_api.pooled_backends.sqlite3',
+            'NAME': path,
+            'CONN_MAX_AGE': 0,
+            'OPTIONS': {'pool': pool_options},
+        }
+        wrapper = PooledSQLiteWrapper(settings_dict, alias=f'pooled-{path}')
+        self.addCleanup(wrapper.pool.close)
+        self.addCleanup(wrapper.close)
+        return wrapper
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'pooled.sqlite3')
+
+    def test_closing_returns_the_connection_for_reuse(self):
+        wrapper = self.make_wrapper(self.path)
+        with wrapper.cursor() as cursor:
+            cursor.execute('CREATE TABLE t (x INTEGER)')
+        raw = wrapper.connection
+        wrapper.close()
+        with wrapper.cursor() as cursor:
+            cursor.execute('SELECT COUNT(*) FROM t')
+        self.assertIs(wrapper.connection, raw)
+        stats = wrapper.pool.stats()
+        self.assertEqual((stats['connections_opened'], stats['acquired']), (1, 2))
+
+    def test_connection_closed_inside_atomic_is_discarded(self):
+        wrapper = self.make_wrapper(self.path)
+        wrapper.ensure_connection()
+        wrapper.in_atomic_block = True  # as inside atomic()
+        wrapper.close()
+        stats = wrapper.pool.stats()
+        self.assertEqual((stats['size'], stats['connections_closed']), (0, 1))
+
+    def test_dead_idle_connection_is_reopened(self):
+        wrapper = self.make_wrapper(self.path, check_idle=0)
+        wrapper.ensure_connection()
+        raw = wrapper.connection
+        wrapper.close()
+        raw.close()  # as if the server dropped it while idle
+        with wrapper.cursor() as cursor:
+            cursor.execute('SELECT 1')
+        self.assertIsNot(wrapper.connection, raw)
+        self.assertEqual(wrapper.pool.stats()['failed_checks'], 1)
+
+    def test_pool_timeout_is_a_database_error(self):
+        wrapper = self.make_wrapper(self.path, max_size=1, timeout=0.05)
+        wrapper.ensure_connection()
+        other = self.make_wrapper(self.path)
+        with self.assertRaises(OperationalError):
+            other.ensure_connection()
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class PoolMetricsTests(APITestCase):
+    def test_admins_see_pool_stats(self):
+        admin = User.objects.create_user(username='admin', password='pass12345', is_staff=True)
+        self.client.force_authenticate(user=admin)
+        response = self.client.get(reverse('db-pool-metrics'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['pid'], os.getpid())
+        self.assertIsInstance(response.data['pools'], dict)
+
+    def test_other_users_are_refused(self):
+        self.client.force_authenticate(user=User.objects.create_user(username='user', password='pass12345'))
+        self.assertEqual(self.client.get(reverse('db-pool-metrics')).status_code, status.HTTP_403_FORBIDDEN)
+
+
+@override_settings(REPLICA_DATABASES=['replica1'], REPLICA_STICKY_SECONDS=5)
+class ReplicaRoutingTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.factory = RequestFactory()
+        self.router = ReplicaRouter()
+        self.seen = []
+
+        def view(request):
+            self.seen.append(self.router.db_for_read(Post))
+            with use_primary():
+                self.seen.append(self.router.db_for_read(Post))
+            return HttpResponse()
+
+        self.middleware = ReplicaRoutingMiddleware(view)
+
+    def request(self, method, token='abc', cookies=None):
+        request = getattr(self.factory, method)('/api/posts/', HTTP_AUTHORIZATION=f'Token {token}')
+        request.COOKIES.update(cookies or {})
+        self.seen.clear()
+        return self.middleware(request)
+
+    def test_safe_requests_read_from_a_replica(self):
+        self.request('get')
+        self.assertEqual(self.seen, ['replica1', 'default'])
+        self.assertEqual(current_read_alias(), 'default')
+
+    def test_writes_use_the_primary_and_pin_the_client(self):
+        response = self.request('post')
+        self.assertEqual(self.seen, ['default', 'default'])
+        self.assertEqual(response.cookies['replica_pin']['max-age'], 5)
+
+        self.request('get')
+        self.assertEqual(self.seen[0], 'default')
+        self.request('get', token='other')
+        self.assertEqual(self.seen[0], 'replica1')
+        self.request('get', token='other', cookies={'replica_pin': '1'})
+        self.assertEqual(self.seen[0], 'default')
+
+    def test_writes_go_to_the_primary_outside_requests(self):
+        self.assertEqual(self.router.db_for_read(Post), 'default')
+        self.assertEqual(self.router.db_for_write(Post), 'default')
+
+    @override_settings(REPLICA_DATABASES=[])
+    def test_no_replicas_configured(self):
+        response = self.request('post')
+        self.assertNotIn('replica_pin', response.cookies)
+        self.request('get')
+        self.assertEqual(self.seen[0], 'default')
+
+
+@override_settings(SECURE_SSL_REDIRECT=False, RESPONSE_CACHE_TIMEOUT=0, REPLICA_DATABASES=['replica1'])
+class ReadReplicaTests(APITransactionTestCase):
+    """Routing end to end; replica1 is a test mirror of the primary (see test_runner.py)."""
+    databases = '__all__'
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='writer', password='pass12345')
+        token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+
+    def post_list_reads(self):
+        """Return how many post queries the post list ran on (primary, replica)."""
+        with CaptureQueriesContext(connections['default']) as primary, \
+                CaptureQueriesContext(connections['replica1']) as replica:
+            response = self.client.get(reverse('post-list'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return tuple(sum('"posts_post"' in query['sql'] for query in queries) > 0 for queries in (primary, replica))
+
+    def test_safe_requests_read_from_the_replica(self):
+        self.assertEqual(self.post_list_reads(), (False, True))
+
+    def test_writes_pin_the_client_to_the_primary_until_the_pin_expires(self):
+        self.client.post(reverse('post-list'), {'title': 'fresh', 'content': 'body'})
+        self.assertEqual(self.post_list_reads(), (True, False))
+
+        cache.clear()
+        self.client.cookies.clear()
+        self.assertEqual(self.post_list_reads(), (False, True))
+
+    def test_token_lookups_use_the_primary(self):
+        with CaptureQueriesContext(connections['replica1']) as replica:
+            self.client.get(reverse('post-list'))
+        self.assertFalse(any('authtoken_token' in query['sql'] for query in replica))
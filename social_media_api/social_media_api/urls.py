@@ -1,9 +1,12 @@
 from django.contrib import admin
 from django.urls import path, include
 
+from social_media_api.views import db_pool_metrics
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/accounts/', include('accounts.urls')),
     path('api/', include('posts.urls')),
     path('api/', include('notifications.urls')),
+    path('api/metrics/db-pool/', db_pool_metrics, name='db-pool-metrics'),
 ]
@@ -0,0 +1,14 @@
+import os
+
+from rest_framework import permissions
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.response import Response
+
+from social_media_api.pool import pool_stats
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAdminUser])
+def db_pool_metrics(request):
+    """Connection pool counters of the worker process that served this request"""
+    return Response({'pid': os.getpid(), 'pools': pool_stats()})
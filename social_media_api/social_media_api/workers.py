@@ -0,0 +1,15 @@
+"""Gunicorn worker classes (see gunicorn.conf.py)."""
+from uvicorn_worker import UvicornWorker as BaseUvicornWorker
+
+
+class UvicornWorker(BaseUvicornWorker):
+    """Uvicorn worker that honours gunicorn's ``worker_connections``.
+
+    Each request in flight may hold a database connection, so capping them
+    keeps the worker within its share of ``DB_MAX_CONNECTIONS``. Requests
+    beyond the cap are answered with 503.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.config.limit_concurrency = self.cfg.worker_connections